@@ -14,6 +14,8 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
 LLM_MODEL = os.getenv("LLM_MODEL", "qwen2.5:14b-instruct")
 LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+# How long Ollama keeps models loaded after a request ("-1" keeps them forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
 # OpenAI settings (used when MODE=openai)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -24,9 +26,83 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Optional, for compatible APIs
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20240620")
 
+# Path to indexes directory
+# Use environment variable if set, otherwise calculate relative path
+INDEXES_DIR = Path(os.getenv("INDEXES_DIR", str(Path(__file__).parent.parent / "indexes")))
+
+# Background indexing jobs (POST /index/jobs): max concurrent builds, and the
+# directory that submitted repo paths must live under (nothing outside it can be indexed via the API)
+INDEX_JOB_CONCURRENCY = int(os.getenv("INDEX_JOB_CONCURRENCY", "1"))
+INDEX_REPO_ROOT = Path(os.getenv("INDEX_REPO_ROOT", Path(__file__).parent.parent / "repos"))
+
+# Index versions kept per index after a rebuild (the published one included)
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+
+# Content-addressed summary/embedding cache shared by every index
+CONTENT_STORE_DIR = os.getenv("CONTENT_STORE_DIR", str(INDEXES_DIR / ".content_store"))
+
+# Startup warmup: preload query engines and load models before /ready reports ready.
+# WARMUP_INDEXES is a comma-separated list of index names; empty means all.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_INDEXES = [name.strip() for name in os.getenv("WARMUP_INDEXES", "").split(",") if name.strip()]
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+
+# Query engines kept in memory per process, most recently used first
+ENGINE_CACHE_SIZE = int(os.getenv("ENGINE_CACHE_SIZE", "16"))
+
 # Query settings
+# Candidates fetched from the vector store (RERANK_CANDIDATES when reranking);
+# RETRIEVAL_DEPTH then decides how many reach the prompt
 SIMILARITY_TOP_K = 12
 
+# Optional second retrieval stage (see LexicalRerankPostprocessor in prompts/filters.py):
+# fetch RERANK_CANDIDATES chunks, rescore them on the CPU and keep the best RERANK_TOP_N
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "40"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "8"))
+# Chunks fetched from the vector store per question
+RETRIEVAL_CANDIDATES = max(RERANK_CANDIDATES, SIMILARITY_TOP_K) if RERANK_ENABLED else SIMILARITY_TOP_K
+
+# Per-mode retrieval depth (see AdaptiveDepthPostprocessor in prompts/filters.py),
+# applied to the vector store's scores before any reranking. With RERANK_ENABLED
+# only min_k / max_k / min_score apply and RERANK_TOP_N sets the depth. The ratios
+# compare squared L2 distances (score = exp(-distance)), so they hold whether or
+# not the embedding model normalizes its vectors.
+RETRIEVAL_DEPTH = {
+    "api_endpoints": {
+        "min_k": 6,
+        "max_k": RETRIEVAL_CANDIDATES,
+        "max_distance_ratio": float(os.getenv("RETRIEVAL_MAX_DISTANCE_RATIO", "1.25")),
+        "max_gap_ratio": float(os.getenv("RETRIEVAL_MAX_GAP_RATIO", "1.08")),
+    },
+    "deep_dive": {
+        "min_k": 3,
+        "max_k": RETRIEVAL_CANDIDATES,
+        "max_distance_ratio": float(os.getenv("RETRIEVAL_MAX_DISTANCE_RATIO", "1.25")),
+        "max_gap_ratio": float(os.getenv("RETRIEVAL_MAX_GAP_RATIO", "1.08")),
+    },
+}
+
+# Serving backend: "chroma" (default) queries the Chroma collection directly,
+# "mmap" serves from a memory-mapped export (see indexing/mmap_index.py) when
+# one exists and falls back to Chroma otherwise. Chroma is always the build store.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# "float32", "float16" or "int8" (per-vector scaled)
+MMAP_DTYPE = os.getenv("MMAP_DTYPE", "float32")
+# Opt-in: quantized exports also write a float32 copy and rescore top_k * factor
+# candidates with it, making them larger on disk than a float32 export (0 disables)
+MMAP_RESCORE_FACTOR = int(os.getenv("MMAP_RESCORE_FACTOR", "0"))
+
+# Answer synthesis per mode: "single" retrieves, packs all chunks into the mode's
+# prompt template and makes exactly one LLM call. Any llama_index response_mode
+# ("compact", "refine", "tree_summarize") uses its synthesizer instead, which can
+# make several sequential LLM calls on large contexts.
+SYNTHESIS_STRATEGY = {
+    "repo_overview": "single",
+    "api_endpoints": os.getenv("API_ENDPOINTS_SYNTHESIS", "single"),
+    "deep_dive": os.getenv("DEEP_DIVE_SYNTHESIS", "single"),
+}
+
 EXCLUDE_DIRS = {".git", "node_modules", "dist", "build", ".next", ".venv", "__pycache__"}
 INDEXED_FILE_EXTENSIONS = {".ts", ".tsx", ".md", ".json"}
 EXCLUDED_FILE_PATTERNS = [".module.ts", ".enum.ts", ".enum.js", ".dto.ts", ".dto.js"]
@@ -71,5 +147,38 @@ DEPLOYMENT_FILE_PATTERNS = [
     'templates/',
 ]
 
+# Answer "where is X defined" questions straight from the index's symbol table
+SYMBOL_LOOKUP_ENABLED = os.getenv("SYMBOL_LOOKUP_ENABLED", "true").lower() == "true"
+
 ROUTER_CONFIDENCE_THRESHOLD = 0.7
 ROUTER_MODEL = LLM_MODEL
+# Questions classified per router LLM call in /ask/batch
+ROUTER_BATCH_SIZE = 20
+
+# Max questions answered concurrently by /ask/batch
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "4"))
+
+# Share of /ask requests profiled with cProfile (0 = only when requested via
+# "profile": true or an X-Profile header); profiles are saved next to the prompt history
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Hottest functions (by cumulative time) summarized in the history entry
+PROFILE_TOP_N = 25
+
+# Sharded serving: shard_router.py fronts these backend nodes (comma-separated
+# base URLs), each running main.py over its own INDEXES_DIR
+SHARD_NODES = [url.strip().rstrip("/") for url in os.getenv("SHARD_NODES", "").split(",") if url.strip()]
+# Seconds the router trusts its index -> node map before re-listing the nodes
+SHARD_REFRESH_SECONDS = float(os.getenv("SHARD_REFRESH_SECONDS", "30"))
+# Timeout for requests forwarded to a node (answers can take a while)
+SHARD_REQUEST_TIMEOUT = float(os.getenv("SHARD_REQUEST_TIMEOUT", "300"))
+
+# How `python prompts/ask.py` answers: "local" loads everything in-process,
+# "server" posts to a running REPO-QA API at REPO_QA_URL, "daemon" talks to a
+# background process over a Unix socket (started on first use) that keeps
+# models and query engines warm between calls
+ASK_CLIENT_MODE = os.getenv("ASK_CLIENT_MODE", "local").lower()
+REPO_QA_URL = os.getenv("REPO_QA_URL", "http://localhost:8000")
+ASK_DAEMON_SOCKET = os.getenv("ASK_DAEMON_SOCKET", f"/tmp/repo-qa-{os.getuid()}.sock")
+# The daemon exits after this many seconds without a question
+ASK_DAEMON_IDLE_SECONDS = int(os.getenv("ASK_DAEMON_IDLE_SECONDS", "900"))
+ASK_DAEMON_START_TIMEOUT = 120
@@ -0,0 +1,87 @@
+import hashlib
+import sqlite3
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import CONTENT_STORE_DIR
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ContentStore:
+    """On-disk cache of file summaries and chunk embeddings shared by all indexes.
+
+    Entries are keyed by a content hash plus the model that produced them, so
+    the same file or chunk is never summarized or embedded twice, whichever
+    index or checkout path it comes from.
+    """
+
+    def __init__(self, path: str = CONTENT_STORE_DIR):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path / "store.sqlite3"), check_same_thread=False, timeout=30)
+        # WAL lets concurrent index builds read while another one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT NOT NULL, model TEXT NOT NULL, summary TEXT NOT NULL, "
+            "PRIMARY KEY (key, model))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (key, model))"
+        )
+        self._conn.commit()
+
+    def get_summary(self, key: str, model: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND model = ?", (key, model)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_summary(self, key: str, model: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, summary) VALUES (?, ?, ?)",
+                (key, model, summary),
+            )
+            self._conn.commit()
+
+    def get_embeddings(self, keys: list[str], model: str) -> dict:
+        """Return {key: embedding} for the keys that are cached."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(unique_keys), 500):
+            batch = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_embeddings(self, embeddings: dict, model: str):
+        rows = [(key, model, array("f", vector).tobytes()) for key, vector in embeddings.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+import json
+import subprocess
+import sys
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llama_index.core import Document
+
+# Written into each index built from a git ref: repo, ref, commit, models and
+# the path -> blob SHA map of every indexed file, used to diff the next build.
+GIT_MANIFEST = "git_source.json"
+# Doc/chunk metadata that must not change what gets embedded
+GIT_METADATA_KEYS = ["file_name", "blob_sha"]
+
+
+def _git(repo: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    result = subprocess.run(["git", "-C", str(repo), *args], input=input, capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace").strip()
+        raise SystemExit(f"git {args[0]} failed in {repo}: {stderr}")
+    return result.stdout
+
+
+def resolve_commit(repo: Path, ref: str) -> str:
+    """Return the commit SHA that ref (branch, tag or SHA) points to."""
+    if not ref or ref.startswith("-"):
+        raise SystemExit(f"Invalid git ref: {ref!r}")
+    return _git(repo, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}").decode().strip()
+
+
+def list_blobs(repo: Path, commit: str) -> dict[str, str]:
+    """Map repo-relative path -> blob SHA for every regular file in the commit's tree."""
+    blobs = {}
+    for entry in _git(repo, "ls-tree", "-r", "-z", "--full-tree", commit).split(b"\0"):
+        if not entry:
+            continue
+        info, path = entry.split(b"\t", 1)
+        mode, kind, sha = info.split()
+        # Skips submodules (kind "commit") and symlinks (mode 120000)
+        if kind == b"blob" and mode != b"120000":
+            blobs[path.decode("utf-8", errors="surrogateescape")] = sha.decode()
+    return blobs
+
+
+def read_blobs(repo: Path, shas: list[str]) -> dict[str, bytes]:
+    """Read blob contents through a single `git cat-file --batch` call."""
+    unique = list(dict.fromkeys(shas))
+    if not unique:
+        return {}
+    output = _git(repo, "cat-file", "--batch", input="".join(f"{sha}\n" for sha in unique).encode())
+
+    contents = {}
+    offset = 0
+    for sha in unique:
+        header_end = output.index(b"\n", offset)
+        # "<sha> blob <size>", or "<sha> missing"
+        header = output[offset:header_end].split()
+        if len(header) != 3:
+            raise SystemExit(f"git object {sha} is missing from {repo}")
+        start = header_end + 1
+        size = int(header[2])
+        contents[sha] = output[start:start + size]
+        offset = start + size + 1
+    return contents
+
+
+def diff_blobs(old: dict[str, str], new: dict[str, str]) -> tuple[dict[str, str], set[str]]:
+    """Diff two path -> blob SHA maps into (added or modified paths with their SHAs, deleted paths)."""
+    changed = {path: sha for path, sha in new.items() if old.get(path) != sha}
+    deleted = set(old) - set(new)
+    return changed, deleted
+
+
+def blob_documents(repo: Path, blobs: dict[str, str]) -> list[Document]:
+    """Build Documents for the given path -> blob SHA map, shaped like SimpleDirectoryReader's."""
+    contents = read_blobs(repo, list(blobs.values()))
+    docs = []
+    for path, sha in sorted(blobs.items()):
+        docs.append(Document(
+            # Same decoding as SimpleDirectoryReader
+            text=contents[sha].decode("utf-8", errors="ignore"),
+            metadata={
+                "file_path": str(repo / path),
+                "file_name": PurePosixPath(path).name,
+                "blob_sha": sha,
+            },
+            excluded_embed_metadata_keys=list(GIT_METADATA_KEYS),
+            excluded_llm_metadata_keys=list(GIT_METADATA_KEYS),
+        ))
+    return docs
+
+
+def read_manifest(index_dir: str) -> Optional[dict]:
+    path = Path(index_dir) / GIT_MANIFEST
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(index_dir: str, manifest: dict):
+    with open(Path(index_dir) / GIT_MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
@@ -1,19 +1,25 @@
 import os
+import shutil
 import sys
-import json
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import chromadb
 from llama_index.core import SimpleDirectoryReader, StorageContext, VectorStoreIndex, Settings
 from llama_index.core.node_parser import SentenceSplitter, CodeSplitter
+from llama_index.core.schema import MetadataMode
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.llms.ollama import Ollama
 
-from config import EXCLUDE_DIRS, INDEXED_FILE_EXTENSIONS, EXCLUDED_FILE_PATTERNS, OLLAMA_BASE_URL, EMBEDDING_MODEL, LLM_MODEL, LLM_TIMEOUT
+from config import EXCLUDE_DIRS, INDEXED_FILE_EXTENSIONS, EXCLUDED_FILE_PATTERNS, OLLAMA_BASE_URL, EMBEDDING_MODEL, LLM_MODEL, LLM_TIMEOUT, VECTOR_BACKEND
+from indexing.content_store import ContentStore, content_hash
+from indexing.git_source import blob_documents, diff_blobs, list_blobs, read_manifest, resolve_commit, write_manifest
+from indexing.mmap_index import export_index, load_collection_vectors
+from indexing.symbols import build_symbol_table, copy_symbols
+from indexing.versions import create_staging, gc_versions, publish, release_chroma, validate
 
 
 def detect_language(file_path: Optional[str]) -> str:
@@ -37,23 +43,68 @@ def detect_language(file_path: Optional[str]) -> str:
 
 
 
-def main(repo_path: str, index_dir: str):
+# progress(stage, done, total) callback used by background indexing jobs
+ProgressCallback = Callable[[str, int, int], None]
+
+# Chunks embedded per call when reporting embedding progress
+EMBED_PROGRESS_BATCH = 100
+# Rows per Chroma add() when copying chunks from a previous version
+COPY_BATCH = 1000
+
+
+def _no_progress(stage: str, done: int, total: int):
+    pass
+
+
+def main(repo_path: str, index_dir: str, progress: Optional[ProgressCallback] = None, ref: Optional[str] = None):
+    """Build a new version of index_dir in staging, validate it and publish it atomically.
+
+    index_dir ends up a symlink to the published version, so readers of the
+    live index never see a half-built collection. With a git ref, the build
+    reads that commit and reuses unchanged blobs from the published version.
+    """
+    # Resolved so the base stays the same version even if another build publishes meanwhile
+    base_index = str(Path(index_dir).resolve()) if ref and Path(index_dir).exists() else None
+    staging = create_staging(Path(index_dir))
+    try:
+        chunk_count = build(repo_path, str(staging), progress, ref=ref, base_index=base_index)
+        validate(staging, chunk_count)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        # Job workers outlive builds; don't keep versions that gc may delete open
+        release_chroma(staging)
+        if base_index:
+            release_chroma(base_index)
+
+    publish(Path(index_dir), staging)
+    gc_versions(Path(index_dir))
+
+
+def build(repo_path: str, index_dir: str, progress: Optional[ProgressCallback] = None,
+          ref: Optional[str] = None, base_index: Optional[str] = None) -> int:
+    """Index repo_path into a fresh index_dir and return the number of chunks written.
+
+    Reads the working tree, or with ref the tree of that commit straight from
+    git. If base_index was built from the same repository by git ref, only
+    blobs that differ from its commit are summarized, split and embedded;
+    chunks and symbols of unchanged blobs are copied from base_index.
+    """
+    progress = progress or _no_progress
     repo = Path(repo_path).resolve()
     if not repo.is_dir():
         raise SystemExit(f"Not a directory: {repo}")
 
-    reader = SimpleDirectoryReader(
-        input_dir=str(repo),
-        recursive=True,
-        exclude_hidden=True,
-        required_exts=list(INDEXED_FILE_EXTENSIONS),
-    )
+    manifest, reuse = None, {}
+    if ref:
+        docs, manifest, reuse = load_git_documents(repo, ref, base_index)
+    else:
+        docs = load_working_tree(repo)
 
-    docs = reader.load_data()
-    docs = [d for d in docs if not should_skip(Path(d.metadata.get("file_path", "")))]
-
-    if not docs:
+    if not docs and not reuse:
         raise SystemExit("No files loaded (check extensions / excludes).")
+    progress("files_read", len(docs), len(docs))
     os.makedirs(index_dir, exist_ok=True)
     chroma = chromadb.PersistentClient(path=index_dir)
     collection = chroma.get_or_create_collection("repo_chunks")
@@ -72,7 +123,8 @@ def main(repo_path: str, index_dir: str):
         request_timeout=LLM_TIMEOUT,
     )
 
-    file_summaries = build_file_summaries(docs, index_dir)
+    store = ContentStore()
+    file_summaries = build_file_summaries(docs, store, repo, progress)
 
     # Map extensions to tree-sitter language names
     ext_to_language = {
@@ -93,6 +145,11 @@ def main(repo_path: str, index_dir: str):
             lang = ext_to_language[ext]
             code_docs_by_lang.setdefault(lang, []).append(d)
 
+    build_symbol_table(code_docs_by_lang, index_dir, repo)
+    if reuse:
+        copied = copy_symbols(base_index, index_dir, {str(repo / path) for path in reuse})
+        print(f"[symbols] {copied} definitions reused from unchanged files")
+
     markdown_docs = [d for d in docs if Path(d.metadata.get("file_path", "")).suffix.lower() in {".md", ".json"}]
 
     nodes = []
@@ -125,17 +182,104 @@ def main(repo_path: str, index_dir: str):
             meta["file_summary"] = summary
             header = (
                 "[File context]\n"
-                f"Path: {file_path or 'unknown'}\n"
+                f"Path: {relative_path(file_path, repo) if file_path else 'unknown'}\n"
                 f"Language: {language}\n"
                 f"Extension: {file_ext}\n"
             )
             node.text = f"{header}\n[File summary]\n{summary}\n\n{node.text}"
         node.metadata = meta
+        # The absolute checkout path would make identical chunks embed differently
+        # across clones; the header above already carries the repo-relative path.
+        if "file_path" not in node.excluded_embed_metadata_keys:
+            node.excluded_embed_metadata_keys = [*node.excluded_embed_metadata_keys, "file_path"]
 
+    embed_nodes_with_store(nodes, store, progress)
+    store.close()
+
+    progress("writing", 0, len(nodes))
+    reused = copy_chunks(base_index, collection, reuse, repo) if reuse else 0
     VectorStoreIndex(nodes, storage_context=storage)
     storage.persist(persist_dir=index_dir)
+    progress("writing", len(nodes), len(nodes))
+
+    if manifest:
+        write_manifest(index_dir, manifest)
+
+    if VECTOR_BACKEND == "mmap":
+        export_index(index_dir)
+
+    print(f"Indexed {len(docs)} files into {index_dir}" + (f" ({len(reuse)} unchanged files reused)" if reuse else ""))
+    return len(nodes) + reused
+
+
+def load_working_tree(repo: Path) -> list:
+    reader = SimpleDirectoryReader(
+        input_dir=str(repo),
+        recursive=True,
+        exclude_hidden=True,
+        required_exts=list(INDEXED_FILE_EXTENSIONS),
+    )
 
-    print(f"Indexed {len(docs)} files into {index_dir}")
+    docs = reader.load_data()
+    return [d for d in docs if not should_skip(Path(d.metadata.get("file_path", "")))]
+
+
+def load_git_documents(repo: Path, ref: str, base_index: Optional[str] = None) -> tuple[list, dict, dict]:
+    """Read the indexed files of the commit at ref from git objects, without a checkout.
+
+    Returns (docs, manifest, reuse). When base_index's manifest comes from the
+    same repository and models, docs only cover blobs that changed since its
+    commit and reuse maps the unchanged paths to their blob SHAs.
+    """
+    commit = resolve_commit(repo, ref)
+    blobs = {path: sha for path, sha in list_blobs(repo, commit).items() if is_indexed(Path(path))}
+    manifest = {
+        "repo": str(repo),
+        "ref": ref,
+        "commit": commit,
+        "embedding_model": EMBEDDING_MODEL,
+        "llm_model": LLM_MODEL,
+        "blobs": blobs,
+    }
+
+    previous = read_manifest(base_index) if base_index else None
+    if previous and all(previous.get(key) == manifest[key] for key in ("repo", "embedding_model", "llm_model")):
+        changed, deleted = diff_blobs(previous["blobs"], blobs)
+        reuse = {path: sha for path, sha in blobs.items() if path not in changed}
+        print(f"[git] {previous['commit'][:12]}..{commit[:12]}: {len(changed)} changed, "
+              f"{len(deleted)} deleted, {len(reuse)} unchanged files")
+    else:
+        changed, reuse = blobs, {}
+        print(f"[git] {ref} ({commit[:12]}): {len(blobs)} files")
+
+    return blob_documents(repo, changed), manifest, reuse
+
+
+def is_indexed(path: Path) -> bool:
+    """Filter for paths in a git tree, matching what load_working_tree reads."""
+    if any(part.startswith(".") for part in path.parts):
+        return False
+    return path.suffix in INDEXED_FILE_EXTENSIONS and not should_skip(path)
+
+
+def copy_chunks(base_index: str, collection, reuse: dict, repo: Path) -> int:
+    """Copy base_index's chunks whose file and blob SHA are both in reuse into collection."""
+    keep = {str(repo / path): sha for path, sha in reuse.items()}
+    ids, documents, metadatas, vectors = load_collection_vectors(base_index)
+    rows = [
+        row for row, meta in enumerate(metadatas)
+        if meta.get("blob_sha") and keep.get(meta.get("file_path")) == meta["blob_sha"]
+    ]
+    for start in range(0, len(rows), COPY_BATCH):
+        batch = rows[start:start + COPY_BATCH]
+        collection.add(
+            ids=[ids[row] for row in batch],
+            embeddings=vectors[batch].tolist(),
+            documents=[documents[row] for row in batch],
+            metadatas=[metadatas[row] for row in batch],
+        )
+    print(f"[git] Reused {len(rows)} chunks from {base_index}")
+    return len(rows)
 
 
 def should_skip(path: Path) -> bool:
@@ -146,35 +290,23 @@ def should_skip(path: Path) -> bool:
     return any(filename.endswith(pattern) for pattern in EXCLUDED_FILE_PATTERNS)
 
 
-def load_summary_cache(index_dir: str) -> dict:
-    cache_file = Path(index_dir) / "file_summaries_cache.json"
-    if cache_file.exists():
-        try:
-            with open(cache_file, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def save_summary_cache(index_dir: str, cache: dict):
-    cache_file = Path(index_dir) / "file_summaries_cache.json"
-    with open(cache_file, "w") as f:
-        json.dump(cache, f, indent=2)
+def relative_path(file_path: str, repo: Path) -> str:
+    try:
+        return Path(file_path).resolve().relative_to(repo).as_posix()
+    except ValueError:
+        return file_path
 
 
-def build_file_summaries(docs: list, index_dir: str) -> dict:
+def build_file_summaries(docs: list, store: ContentStore, repo: Path, progress: ProgressCallback = _no_progress) -> dict:
     llm = Settings.llm
 
-    # Load existing cache
-    cache = load_summary_cache(index_dir)
-
     summaries = {}
     total = len(docs)
     cached_count = 0
     generated_count = 0
 
     for idx, doc in enumerate(docs, start=1):
+        progress("summaries", idx - 1, total)
         meta = doc.metadata or {}
         file_path = meta.get("file_path") or meta.get("filename")
         if not file_path or file_path in summaries:
@@ -185,18 +317,14 @@ def build_file_summaries(docs: list, index_dir: str) -> dict:
             summaries[file_path] = "Empty file."
             continue
 
-        # Check if we have a valid cached summary
-        cached_entry = cache.get(file_path)
-        if cached_entry:
-            try:
-                file_mtime = os.path.getmtime(file_path)
-                if cached_entry.get("mtime") == file_mtime and cached_entry.get("summary"):
-                    summaries[file_path] = cached_entry["summary"]
-                    cached_count += 1
-                    print(f"[summaries] ({idx}/{total}) {file_path} [cached]")
-                    continue
-            except Exception:
-                pass  # File might not exist or mtime check failed, regenerate
+        # Summaries are keyed by content, so moved or copied files stay cached
+        key = content_hash(text)
+        cached_summary = store.get_summary(key, LLM_MODEL)
+        if cached_summary:
+            summaries[file_path] = cached_summary
+            cached_count += 1
+            print(f"[summaries] ({idx}/{total}) {file_path} [cached]")
+            continue
 
         # Generate new summary
         print(f"[summaries] ({idx}/{total}) {file_path}")
@@ -206,36 +334,61 @@ def build_file_summaries(docs: list, index_dir: str) -> dict:
             "Summarize purpose and key behaviors in 3-5 short bullets.\n"
             "Focus on responsibilities, important functions/classes, and inputs/outputs.\n"
             "Keep under 80 words.\n"
-            f"File path: {file_path}\n"
+            f"File path: {relative_path(file_path, repo)}\n"
             f"Content:\n{snippet}\n"
         )
         try:
             summary = str(llm.complete(prompt)).strip()
             summaries[file_path] = summary
             generated_count += 1
-
-            # Update cache
-            try:
-                file_mtime = os.path.getmtime(file_path)
-                cache[file_path] = {
-                    "summary": summary,
-                    "mtime": file_mtime
-                }
-            except Exception:
-                cache[file_path] = {"summary": summary, "mtime": None}
+            store.put_summary(key, LLM_MODEL, summary)
 
         except Exception as exc:
             print(f"[summaries] failed: {file_path} ({exc})")
             summaries[file_path] = "Summary failed."
 
-    # Save updated cache
-    save_summary_cache(index_dir, cache)
-
+    progress("summaries", total, total)
     print(f"\n[summaries] Total: {total} files | Cached: {cached_count} | Generated: {generated_count}")
 
     return summaries
 
+
+def embed_nodes_with_store(nodes: list, store: ContentStore, progress: ProgressCallback = _no_progress):
+    """Attach embeddings to nodes, embedding only chunks missing from the store.
+
+    VectorStoreIndex skips nodes that already carry an embedding.
+    """
+    keys = [content_hash(node.get_content(metadata_mode=MetadataMode.EMBED)) for node in nodes]
+    cached = store.get_embeddings(keys, EMBEDDING_MODEL)
+
+    missing = {}
+    for node, key in zip(nodes, keys):
+        if key not in cached and key not in missing:
+            missing[key] = node.get_content(metadata_mode=MetadataMode.EMBED)
+
+    total = len(nodes)
+    done = total - len(missing)
+    progress("embeddings", done, total)
+    if missing:
+        print(f"[embeddings] Embedding {len(missing)} new chunks")
+        pending = list(missing.items())
+        for start in range(0, len(pending), EMBED_PROGRESS_BATCH):
+            batch = pending[start:start + EMBED_PROGRESS_BATCH]
+            vectors = Settings.embed_model.get_text_embedding_batch([text for _, text in batch])
+            generated = {key: vector for (key, _), vector in zip(batch, vectors)}
+            store.put_embeddings(generated, EMBEDDING_MODEL)
+            cached.update(generated)
+            done += len(batch)
+            progress("embeddings", done, total)
+            print(f"[embeddings] ({done}/{total})")
+
+    for node, key in zip(nodes, keys):
+        node.embedding = cached[key]
+
+    print(f"[embeddings] Total: {len(nodes)} chunks | Cached: {len(nodes) - len(missing)} | Generated: {len(missing)}")
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        raise SystemExit("Usage: python index_repo.py /path/to/repo /path/to/index_dir")
-    main(sys.argv[1], sys.argv[2])
+        raise SystemExit("Usage: python index_repo.py /path/to/repo /path/to/index_dir [git-ref]")
+    main(sys.argv[1], sys.argv[2], ref=sys.argv[3] if len(sys.argv) > 3 else None)
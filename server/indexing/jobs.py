@@ -0,0 +1,165 @@
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import INDEX_JOB_CONCURRENCY
+
+
+def _run_job(job_id: str, repo_path: str, index_dir: str, events, ref: Optional[str] = None):
+    """Worker-process entry point: build one index and report progress on the events queue."""
+    from indexing.index_repo import main as build_index
+
+    def progress(stage: str, done: int, total: int):
+        events.put((job_id, "progress", {"stage": stage, "done": done, "total": total}))
+
+    events.put((job_id, "started", {}))
+    try:
+        build_index(repo_path, index_dir, progress, ref=ref)
+    except BaseException as exc:
+        # index_repo reports user errors with SystemExit
+        detail = str(exc) if isinstance(exc, SystemExit) else f"{type(exc).__name__}: {exc}"
+        events.put((job_id, "failed", {"error": detail, "traceback": traceback.format_exc()}))
+        return
+    events.put((job_id, "succeeded", {}))
+
+
+class IndexJobManager:
+    """Runs index builds in a separate process pool and tracks their progress.
+
+    Builds never share the API process's interpreter, so they cannot starve
+    /ask. At most max_workers builds run at once; further jobs queue.
+    """
+
+    def __init__(self, max_workers: int = INDEX_JOB_CONCURRENCY):
+        self.max_workers = max(1, max_workers)
+        self._jobs: dict = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._events = None
+
+    def _ensure_started(self):
+        # Worker processes are only started once the first job is submitted
+        if self._executor is not None:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        self._executor = self._new_executor()
+        threading.Thread(target=self._drain_events, daemon=True).start()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, repo_path: str, index_name: str, index_dir: str, ref: Optional[str] = None) -> dict:
+        with self._lock:
+            self._ensure_started()
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "index": index_name,
+                "repo_path": repo_path,
+                "ref": ref,
+                "status": "queued",
+                "stage": "queued",
+                "progress": {},
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "_stage_started_at": None,
+                "_stage_start_done": 0,
+            }
+            try:
+                future = self._executor.submit(_run_job, job_id, repo_path, index_dir, self._events, ref)
+            except BrokenProcessPool:
+                # A worker died abruptly (e.g. OOM-killed); its jobs already failed in _on_done
+                print("[jobs] Process pool is broken, starting a new one")
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                future = self._executor.submit(_run_job, job_id, repo_path, index_dir, self._events, ref)
+            future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        return self.get(job_id)
+
+    def _on_done(self, job_id: str, future):
+        # Catches pool-level failures (e.g. a crashed worker) that never reach the queue
+        exc = future.exception()
+        if exc is not None:
+            self._apply(job_id, "failed", {"error": f"{type(exc).__name__}: {exc}"})
+
+    def _drain_events(self):
+        while True:
+            try:
+                job_id, kind, payload = self._events.get()
+            except (EOFError, OSError):
+                return
+            self._apply(job_id, kind, payload)
+
+    def _apply(self, job_id: str, kind: str, payload: dict):
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in ("succeeded", "failed"):
+                return
+            if kind == "started":
+                job["status"] = "running"
+                job["started_at"] = now
+            elif kind == "progress":
+                stage = payload["stage"]
+                if stage != job["stage"]:
+                    job["stage"] = stage
+                    job["_stage_started_at"] = now
+                    # Work already done on entry (e.g. cached embeddings) doesn't count toward the rate
+                    job["_stage_start_done"] = payload["done"]
+                job["progress"][stage] = {"done": payload["done"], "total": payload["total"]}
+            elif kind == "succeeded":
+                job["status"] = "succeeded"
+                job["stage"] = "done"
+                job["finished_at"] = now
+            elif kind == "failed":
+                job["status"] = "failed"
+                job["error"] = payload.get("error")
+                job["finished_at"] = now
+                if payload.get("traceback"):
+                    print(f"[jobs] {job_id} failed:\n{payload['traceback']}")
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values()]
+
+    def _snapshot(self, job: dict) -> dict:
+        """Public view of a job, with rate and ETA for the current stage."""
+        snapshot = {key: value for key, value in job.items() if not key.startswith("_")}
+        snapshot["progress"] = {stage: dict(counts) for stage, counts in job["progress"].items()}
+        snapshot["rate"] = None
+        snapshot["eta_seconds"] = None
+
+        current = job["progress"].get(job["stage"])
+        stage_started = job["_stage_started_at"]
+        if job["status"] == "running" and current and stage_started:
+            elapsed = time.time() - stage_started
+            processed = current["done"] - job["_stage_start_done"]
+            if elapsed > 0 and processed > 0:
+                rate = processed / elapsed
+                snapshot["rate"] = round(rate, 2)
+                snapshot["eta_seconds"] = round((current["total"] - current["done"]) / rate, 1)
+        return snapshot
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
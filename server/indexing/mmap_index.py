@@ -0,0 +1,275 @@
+import json
+import math
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import MMAP_DTYPE, MMAP_RESCORE_FACTOR
+
+EXPORT_DIRNAME = "mmap"
+# Bumped when the export layout changes; older exports are served from Chroma until re-exported
+EXPORT_VERSION = 2
+CHUNKS_FILENAME = "chunks.sqlite3"
+COLLECTION_NAME = "repo_chunks"
+MMAP_DTYPES = ("float32", "float16", "int8")
+# Rows scored per matmul block, bounds the float32 upcast of quantized matrices
+SEARCH_BLOCK_ROWS = 65536
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> tuple:
+    """Return (stored_matrix, per_row_scales) for a float32 matrix.
+
+    int8 uses symmetric per-vector scaling (row ~= scale * int8_row); the other
+    dtypes are a plain cast and need no scales.
+    """
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        stored = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return stored, scales.astype(np.float32)
+    return matrix.astype(dtype), None
+
+
+def search_vectors(vectors, sq_norms, query_embedding, top_k: int, scales=None, full_vectors=None,
+                   rescore_factor: int = 0) -> list[tuple[int, float]]:
+    """Brute-force top-k over squared L2 distance, scored exp(-distance) like ChromaVectorStore.
+
+    vectors may be float32, float16 or int8 (with per-row scales); only
+    float32 is exact. When
+    full_vectors is given, the best top_k * rescore_factor candidates from the
+    stored matrix are rescored against the full-precision rows.
+    """
+    count = len(vectors)
+    if not count:
+        return []
+    top_k = min(top_k, count)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query_sq_norm = float(query @ query)
+
+    # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x
+    distances = np.empty(count, dtype=np.float32)
+    for start in range(0, count, SEARCH_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+        dots = block @ query
+        if scales is not None:
+            dots *= scales[start:start + len(block)]
+        distances[start:start + len(block)] = sq_norms[start:start + len(block)] - 2.0 * dots
+    distances += query_sq_norm
+
+    if full_vectors is not None and rescore_factor > 1:
+        candidates = min(count, top_k * rescore_factor)
+        rows = np.sort(np.argpartition(distances, candidates - 1)[:candidates])
+        # Fancy indexing an mmap only pages in the candidate rows
+        exact = np.asarray(full_vectors[rows], dtype=np.float32)
+        diffs = exact - query
+        distances = np.full(count, np.inf, dtype=np.float32)
+        distances[rows] = np.einsum("ij,ij->i", diffs, diffs)
+
+    np.maximum(distances, 0.0, out=distances)
+    rows = np.argpartition(distances, top_k - 1)[:top_k]
+    rows = rows[np.argsort(distances[rows])]
+    # math.exp in float64 like Chroma; float32 exp underflows to 0 past a distance of ~103
+    return [(int(row), math.exp(-float(distances[row]))) for row in rows]
+
+
+def load_collection_vectors(index_dir: str) -> tuple:
+    """Read (ids, documents, metadatas, float32 matrix) from the Chroma collection."""
+    import chromadb
+
+    chroma = chromadb.PersistentClient(path=index_dir)
+    collection = chroma.get_collection(COLLECTION_NAME)
+
+    ids, documents, metadatas, vectors = [], [], [], []
+    total = collection.count()
+    for offset in range(0, total, 1000):
+        batch = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=1000,
+            offset=offset,
+        )
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"])
+        vectors.extend(batch["embeddings"])
+
+    if not ids:
+        raise ValueError(f"Collection '{COLLECTION_NAME}' in {index_dir} is empty")
+
+    return ids, documents, metadatas, np.asarray(vectors, dtype=np.float32)
+
+
+def write_chunks(db_path: Path, ids: list, documents: list, metadatas: list):
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL, document TEXT, metadata TEXT)")
+    conn.executemany(
+        "INSERT INTO chunks VALUES (?, ?, ?, ?)",
+        [(row, ids[row], documents[row], json.dumps(metadatas[row])) for row in range(len(ids))],
+    )
+    conn.commit()
+    conn.close()
+
+
+def export_index(index_dir: str, dtype: str = MMAP_DTYPE, rescore: bool = MMAP_RESCORE_FACTOR > 1) -> Path:
+    """Export the Chroma collection in index_dir to a read-only memory-mapped layout.
+
+    Writes <index_dir>/mmap/ with:
+      vectors.npy       (n, dim) matrix in float32, float16 or int8
+      scales.npy        (n,) float32 per-row scales (int8 only)
+      vectors_full.npy  (n, dim) float32 rows for rescoring (quantized, MMAP_RESCORE_FACTOR > 1 only)
+      sq_norms.npy      (n,) float32 squared L2 norms of the full-precision rows
+      chunks.sqlite3    ids, documents and JSON metadatas keyed by row
+      manifest.json     dtype, shape and format version
+    """
+    if dtype not in MMAP_DTYPES:
+        raise ValueError(f"Unsupported mmap dtype: {dtype}. Use one of {', '.join(MMAP_DTYPES)}.")
+
+    ids, documents, metadatas, matrix = load_collection_vectors(index_dir)
+    sq_norms = np.einsum("ij,ij->i", matrix, matrix).astype(np.float32)
+    stored, scales = quantize(matrix, dtype)
+    rescore = rescore and dtype != "float32"
+
+    export_dir = Path(index_dir) / EXPORT_DIRNAME
+    tmp_dir = export_dir.with_name(EXPORT_DIRNAME + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    for stale in tmp_dir.iterdir():
+        stale.unlink()
+    np.save(tmp_dir / "vectors.npy", stored)
+    if scales is not None:
+        np.save(tmp_dir / "scales.npy", scales)
+    if rescore:
+        np.save(tmp_dir / "vectors_full.npy", matrix)
+    np.save(tmp_dir / "sq_norms.npy", sq_norms)
+    write_chunks(tmp_dir / CHUNKS_FILENAME, ids, documents, metadatas)
+    with open(tmp_dir / "manifest.json", "w") as f:
+        json.dump({
+            "version": EXPORT_VERSION,
+            "dtype": dtype,
+            "count": len(ids),
+            "dim": int(matrix.shape[1]),
+            "rescore": rescore,
+        }, f, indent=2)
+
+    # Swap the finished export in so readers never see a partial one
+    if export_dir.exists():
+        old_dir = export_dir.with_name(EXPORT_DIRNAME + ".old")
+        export_dir.rename(old_dir)
+        tmp_dir.rename(export_dir)
+        for child in old_dir.iterdir():
+            child.unlink()
+        old_dir.rmdir()
+    else:
+        tmp_dir.rename(export_dir)
+
+    print(f"[mmap] Exported {len(ids)} vectors ({dtype}{', rescore' if rescore else ''}) to {export_dir}")
+    return export_dir
+
+
+def has_export(index_dir: str) -> bool:
+    manifest = Path(index_dir) / EXPORT_DIRNAME / "manifest.json"
+    if not manifest.exists():
+        return False
+    with open(manifest) as f:
+        return json.load(f).get("version") == EXPORT_VERSION
+
+
+class MmapVectorIndex:
+    """Read-only vector index backed by memory-mapped NumPy arrays.
+
+    Every process maps the same files, so all workers share one copy of the
+    vectors through the OS page cache. Chunk texts and metadata stay in
+    chunks.sqlite3 and are read per query. See search_vectors for scoring.
+    """
+
+    def __init__(self, index_dir: str, rescore_factor: int = MMAP_RESCORE_FACTOR):
+        export_dir = Path(index_dir) / EXPORT_DIRNAME
+        with open(export_dir / "manifest.json") as f:
+            self.manifest = json.load(f)
+        self.vectors = np.load(export_dir / "vectors.npy", mmap_mode="r")
+        self.sq_norms = np.load(export_dir / "sq_norms.npy", mmap_mode="r")
+        self.scales = np.load(export_dir / "scales.npy") if (export_dir / "scales.npy").exists() else None
+        self.full_vectors = None
+        if self.manifest.get("rescore") and rescore_factor > 1:
+            self.full_vectors = np.load(export_dir / "vectors_full.npy", mmap_mode="r")
+        self.rescore_factor = rescore_factor
+        db_path = export_dir / CHUNKS_FILENAME
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, query_embedding: list, top_k: int) -> list[tuple[int, float]]:
+        """Return [(row, score)] for the top_k nearest rows, best first."""
+        return search_vectors(
+            self.vectors, self.sq_norms, query_embedding, top_k,
+            scales=self.scales, full_vectors=self.full_vectors, rescore_factor=self.rescore_factor,
+        )
+
+    def rows(self, rows: list[int]) -> list[tuple[str, str, dict]]:
+        """Return (id, document, metadata) for each row, in the given order."""
+        if not rows:
+            return []
+        found = {
+            row: (chunk_id, document, json.loads(metadata))
+            for row, chunk_id, document, metadata in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({', '.join('?' * len(rows))})",
+                [int(row) for row in rows],
+            )
+        }
+        return [found[row] for row in rows]
+
+    def get(self, ids: Optional[list] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+            **kwargs) -> dict:
+        """Chroma-compatible collection.get(), read from chunks.sqlite3 on each call."""
+        query, params = "SELECT id, document, metadata FROM chunks", []
+        if ids is not None:
+            query += f" WHERE id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        query += " ORDER BY row LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset or 0])
+
+        result = {"ids": [], "documents": [], "metadatas": []}
+        for chunk_id, document, metadata in self._conn.execute(query, params):
+            result["ids"].append(chunk_id)
+            result["documents"].append(document)
+            result["metadatas"].append(json.loads(metadata))
+        return result
+
+    def count(self) -> int:
+        return len(self)
+
+
+_loaded: dict = {}
+_loaded_lock = threading.Lock()
+
+
+def load_index(index_dir: str) -> MmapVectorIndex:
+    """Return a process-wide MmapVectorIndex, reloading when the export changes.
+
+    Entries are keyed by the resolved version directory, so a published
+    rebuild loads fresh, and versions removed by gc_versions are dropped.
+    """
+    manifest = Path(index_dir) / EXPORT_DIRNAME / "manifest.json"
+    mtime = manifest.stat().st_mtime
+    key = str(Path(index_dir).resolve())
+    with _loaded_lock:
+        for stale in [path for path in _loaded if not Path(path).exists()]:
+            del _loaded[stale]
+        cached: Optional[tuple] = _loaded.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = MmapVectorIndex(index_dir)
+        _loaded[key] = (mtime, index)
+        return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python indexing/mmap_index.py /path/to/index_dir [float32|float16|int8]")
+    export_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else MMAP_DTYPE)
@@ -0,0 +1,103 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import MMAP_RESCORE_FACTOR
+from indexing.mmap_index import EXPORT_DIRNAME, load_collection_vectors, quantize, search_vectors, write_chunks
+
+# Factor for the +rescore rows while MMAP_RESCORE_FACTOR leaves rescoring off
+DEFAULT_RESCORE_FACTOR = 4
+
+# (label, dtype, rescore)
+SETTINGS = [
+    ("float32", "float32", False),
+    ("float16", "float16", False),
+    ("float16+rescore", "float16", True),
+    ("int8", "int8", False),
+    ("int8+rescore", "int8", True),
+]
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def directory_size(path: Path, skip: str) -> int:
+    """Bytes of the files under path, leaving out its top-level skip directory."""
+    return sum(
+        child.stat().st_size for child in path.rglob("*")
+        if child.is_file() and child.relative_to(path).parts[0] != skip
+    )
+
+
+def top_rows(results: list, exclude: int, top_k: int) -> set:
+    return set([row for row, _ in results if row != exclude][:top_k])
+
+
+def main(index_dir: str, num_queries: int = 200, top_k: int = 10, rescore_factor: int = MMAP_RESCORE_FACTOR):
+    """Print recall@k versus exact float32 search and storage size per setting.
+
+    Queries are a random sample of the index's own chunk vectors; each query's
+    own row is excluded from both result lists. "export" is the size of an
+    mmap export with that setting; "index dir" adds everything else in the
+    index directory, including Chroma's own float32 vectors and HNSW index,
+    which every setting keeps.
+    """
+    if rescore_factor <= 1:
+        rescore_factor = DEFAULT_RESCORE_FACTOR
+    ids, documents, metadatas, matrix = load_collection_vectors(index_dir)
+    sq_norms = np.einsum("ij,ij->i", matrix, matrix).astype(np.float32)
+
+    base_size = directory_size(Path(index_dir).resolve(), EXPORT_DIRNAME)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_chunks(Path(tmp) / "chunks.sqlite3", ids, documents, metadatas)
+        chunks_size = (Path(tmp) / "chunks.sqlite3").stat().st_size
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(matrix), size=min(num_queries, len(matrix)), replace=False)
+
+    truth = {
+        int(row): top_rows(search_vectors(matrix, sq_norms, matrix[row], top_k + 1), row, top_k)
+        for row in query_rows
+    }
+
+    print(f"Index: {index_dir} | vectors: {len(matrix)} x {matrix.shape[1]} | queries: {len(query_rows)} | k={top_k}"
+          f" | rescore factor: {rescore_factor}")
+    print(f"Index dir without an mmap export: {format_bytes(base_size)}")
+    print(f"{'setting':<18}{'scanned':>12}{'export':>12}{'index dir':>12}{'recall@k':>10}")
+
+    for label, dtype, rescore in SETTINGS:
+        stored, scales = quantize(matrix, dtype)
+        full = matrix if rescore else None
+        scanned = stored.nbytes + sq_norms.nbytes + (scales.nbytes if scales is not None else 0)
+        export = scanned + chunks_size + (matrix.nbytes if rescore else 0)
+
+        hits = 0
+        for row in query_rows:
+            results = search_vectors(
+                stored, sq_norms, matrix[row], top_k + 1,
+                scales=scales, full_vectors=full, rescore_factor=rescore_factor,
+            )
+            hits += len(top_rows(results, row, top_k) & truth[int(row)])
+        recall = hits / (len(query_rows) * top_k)
+
+        print(f"{label:<18}{format_bytes(scanned):>12}{format_bytes(export):>12}"
+              f"{format_bytes(base_size + export):>12}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python indexing/quantization_report.py /path/to/index_dir [num_queries] [top_k]")
+    main(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+    )
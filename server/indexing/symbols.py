@@ -0,0 +1,210 @@
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SYMBOLS_FILENAME = "symbols.sqlite3"
+MAX_SIGNATURE_CHARS = 200
+
+# tree-sitter node type -> symbol kind, per CodeSplitter language name
+DEFINITION_NODE_KINDS = {
+    "python": {
+        "function_definition": "function",
+        "class_definition": "class",
+    },
+    "typescript": {
+        "function_declaration": "function",
+        "generator_function_declaration": "function",
+        "class_declaration": "class",
+        "abstract_class_declaration": "class",
+        "method_definition": "method",
+        "interface_declaration": "interface",
+        "type_alias_declaration": "type",
+        "enum_declaration": "enum",
+    },
+    "javascript": {
+        "function_declaration": "function",
+        "generator_function_declaration": "function",
+        "class_declaration": "class",
+        "method_definition": "method",
+    },
+    "go": {
+        "function_declaration": "function",
+        "method_declaration": "method",
+        "type_spec": "type",
+    },
+    "java": {
+        "class_declaration": "class",
+        "interface_declaration": "interface",
+        "enum_declaration": "enum",
+        "method_declaration": "method",
+        "constructor_declaration": "constructor",
+    },
+}
+DEFINITION_NODE_KINDS["tsx"] = DEFINITION_NODE_KINDS["typescript"]
+
+# `const handler = () => {}` style definitions in JS/TS
+FUNCTION_VALUE_TYPES = {"arrow_function", "function", "function_expression", "generator_function"}
+CLASS_KINDS = {"class", "interface"}
+
+
+def _signature(node, source: bytes) -> str:
+    text = source[node.start_byte:node.end_byte].decode("utf-8", errors="replace")
+    first_line = text.splitlines()[0].rstrip() if text else ""
+    # Drop the body opener so signatures read like declarations
+    if first_line.endswith("{"):
+        first_line = first_line[:-1]
+    return first_line.strip()[:MAX_SIGNATURE_CHARS]
+
+
+def extract_symbols(source: str, language: str) -> list[dict]:
+    """Return definitions in source as dicts with name, kind, parent, lines and signature."""
+    kinds = DEFINITION_NODE_KINDS.get(language)
+    if not kinds:
+        return []
+
+    from tree_sitter_languages import get_parser
+
+    source_bytes = source.encode("utf-8")
+    tree = get_parser(language).parse(source_bytes)
+    symbols = []
+
+    def visit(node, parent: Optional[str]):
+        kind = kinds.get(node.type)
+        name_node = node.child_by_field_name("name")
+
+        if kind is None and node.type == "variable_declarator" and name_node is not None:
+            value = node.child_by_field_name("value")
+            if value is not None and value.type in FUNCTION_VALUE_TYPES:
+                kind = "function"
+
+        child_parent = parent
+        if kind and name_node is not None:
+            name = name_node.text.decode("utf-8", errors="replace")
+            symbols.append({
+                "name": name,
+                "kind": kind,
+                "parent": parent,
+                "start_line": node.start_point[0] + 1,
+                "end_line": node.end_point[0] + 1,
+                "signature": _signature(node, source_bytes),
+            })
+            if kind in CLASS_KINDS:
+                child_parent = name
+
+        for child in node.children:
+            visit(child, child_parent)
+
+    visit(tree.root_node, None)
+    return symbols
+
+
+def build_symbol_table(code_docs_by_lang: dict, index_dir: str, repo: Path) -> int:
+    """Parse every code document and write the symbol table into index_dir."""
+    db_path = Path(index_dir) / SYMBOLS_FILENAME
+    if db_path.exists():
+        db_path.unlink()
+
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "CREATE TABLE symbols ("
+        "name TEXT NOT NULL, name_lower TEXT NOT NULL, kind TEXT NOT NULL, parent TEXT, "
+        "file_path TEXT NOT NULL, relative_path TEXT NOT NULL, "
+        "start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, signature TEXT)"
+    )
+
+    count = 0
+    seen_files = set()
+    for lang, docs in code_docs_by_lang.items():
+        for doc in docs:
+            file_path = (doc.metadata or {}).get("file_path")
+            if not file_path or file_path in seen_files:
+                continue
+            seen_files.add(file_path)
+            try:
+                symbols = extract_symbols(doc.text or "", lang)
+            except Exception as exc:
+                print(f"[symbols] failed: {file_path} ({exc})")
+                continue
+
+            try:
+                relative = Path(file_path).resolve().relative_to(repo).as_posix()
+            except ValueError:
+                relative = file_path
+
+            conn.executemany(
+                "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (s["name"], s["name"].lower(), s["kind"], s["parent"], file_path, relative,
+                     s["start_line"], s["end_line"], s["signature"])
+                    for s in symbols
+                ],
+            )
+            count += len(symbols)
+
+    conn.execute("CREATE INDEX symbols_name_lower ON symbols (name_lower)")
+    conn.commit()
+    conn.close()
+
+    print(f"[symbols] {count} definitions in {len(seen_files)} files")
+    return count
+
+
+def copy_symbols(from_index_dir: str, index_dir: str, file_paths: set) -> int:
+    """Copy the rows for file_paths from another index's symbol table into index_dir's."""
+    source = Path(from_index_dir) / SYMBOLS_FILENAME
+    if not file_paths or not source.exists():
+        return 0
+
+    conn = sqlite3.connect(str(Path(index_dir) / SYMBOLS_FILENAME))
+    conn.execute("ATTACH DATABASE ? AS previous", (str(source),))
+    conn.execute("CREATE TEMP TABLE copy_paths (file_path TEXT PRIMARY KEY)")
+    conn.executemany("INSERT INTO copy_paths VALUES (?)", [(path,) for path in file_paths])
+    count = conn.execute(
+        "INSERT INTO symbols SELECT * FROM previous.symbols "
+        "WHERE file_path IN (SELECT file_path FROM copy_paths)"
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+
+class SymbolTable:
+    """Read-only exact/prefix lookup over an index's symbol table."""
+
+    def __init__(self, index_dir: str):
+        db_path = Path(index_dir) / SYMBOLS_FILENAME
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return (Path(index_dir) / SYMBOLS_FILENAME).exists()
+
+    def lookup(self, name: str, prefix: bool = False, kind: Optional[str] = None,
+               parent: Optional[str] = None, limit: int = 20) -> list[dict]:
+        """Case-insensitive lookup; exact-case matches sort first."""
+        lowered = name.lower()
+        if prefix:
+            # Range scan on the name_lower index instead of LIKE
+            clauses, params = ["name_lower >= ? AND name_lower < ?"], [lowered, lowered + "\U0010ffff"]
+        else:
+            clauses, params = ["name_lower = ?"], [lowered]
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if parent:
+            clauses.append("LOWER(parent) = ?")
+            params.append(parent.lower())
+
+        rows = self._conn.execute(
+            f"SELECT * FROM symbols WHERE {' AND '.join(clauses)} "
+            "ORDER BY name = ? DESC, LENGTH(name), relative_path, start_line LIMIT ?",
+            [*params, name, limit],
+        ).fetchall()
+        return [{key: row[key] for key in row.keys() if key != "name_lower"} for row in rows]
+
+    def close(self):
+        self._conn.close()
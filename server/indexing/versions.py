@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import INDEX_KEEP_VERSIONS
+
+# Builds live in <indexes>/.versions/<name>/<version>; <indexes>/<name> is a
+# relative symlink to the published version, swapped atomically on publish.
+VERSIONS_DIRNAME = ".versions"
+STAGING_SUFFIX = ".staging"
+# Staging dirs older than this are leftovers from crashed builds
+STALE_STAGING_SECONDS = 24 * 60 * 60
+
+
+def find_indexes(indexes_dir: Path) -> list[Path]:
+    """Published indexes under indexes_dir (versioned symlinks or legacy directories)."""
+    indexes_dir = Path(indexes_dir)
+    if not indexes_dir.exists():
+        return []
+
+    indexes = []
+    for item in indexes_dir.iterdir():
+        if item.is_dir() and not item.name.startswith("."):
+            # Check if it has ChromaDB files (chroma.sqlite3)
+            if (item / "chroma.sqlite3").exists():
+                indexes.append(item)
+    return indexes
+
+
+def versions_root(index_dir: Path) -> Path:
+    index_dir = Path(index_dir)
+    return index_dir.parent / VERSIONS_DIRNAME / index_dir.name
+
+
+def create_staging(index_dir: Path) -> Path:
+    """Create an empty directory to build a new version of index_dir into."""
+    version = time.strftime("%Y%m%d_%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    staging = versions_root(index_dir) / (version + STAGING_SUFFIX)
+    staging.mkdir(parents=True)
+    return staging
+
+
+def release_chroma(index_dir) -> None:
+    """Close the Chroma client for index_dir so its SQLite and HNSW files are released.
+
+    chromadb keeps every PersistentClient's system in a class-level dict for
+    the life of the process, so dropping the client alone closes nothing.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    identifier = str(index_dir)
+    # Newer chromadb also refcounts clients per directory
+    getattr(SharedSystemClient, "_identifier_to_refcount", {}).pop(identifier, None)
+    system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+    if system is not None:
+        system.stop()
+
+
+def validate(staging: Path, expected_chunks: int):
+    """Raise ValueError unless staging holds a complete, queryable index."""
+    import chromadb
+
+    if not (staging / "chroma.sqlite3").exists():
+        raise ValueError(f"Build in {staging} has no chroma.sqlite3")
+
+    chroma = chromadb.PersistentClient(path=str(staging))
+    count = chroma.get_collection("repo_chunks").count()
+    if count != expected_chunks:
+        raise ValueError(f"Build in {staging} has {count} chunks, expected {expected_chunks}")
+
+    manifest = staging / "mmap" / "manifest.json"
+    if manifest.exists():
+        with open(manifest) as f:
+            exported = json.load(f).get("count")
+        if exported != count:
+            raise ValueError(f"mmap export in {staging} has {exported} vectors, expected {count}")
+
+
+def publish(index_dir: Path, staging: Path) -> Path:
+    """Atomically point index_dir at the build in staging and return the version dir."""
+    index_dir = Path(index_dir)
+    version = staging.with_name(staging.name[:-len(STAGING_SUFFIX)])
+    staging.rename(version)
+
+    link_tmp = index_dir.parent / f".{index_dir.name}.link-{uuid.uuid4().hex[:8]}"
+    os.symlink(os.path.relpath(version, index_dir.parent), link_tmp)
+
+    if index_dir.exists() and not index_dir.is_symlink():
+        # One-time migration of an index built before versioning
+        legacy = versions_root(index_dir) / ("legacy-" + time.strftime("%Y%m%d_%H%M%S"))
+        index_dir.rename(legacy)
+
+    os.replace(link_tmp, index_dir)
+    print(f"[versions] Published {version.name} as {index_dir}")
+    return version
+
+
+def gc_versions(index_dir: Path, keep: int = INDEX_KEEP_VERSIONS) -> list[Path]:
+    """Delete all but the newest `keep` versions, never the published one.
+
+    Keeping the previous version around lets requests that resolved the old
+    path before a swap finish against intact files.
+    """
+    root = versions_root(index_dir)
+    if not root.is_dir():
+        return []
+
+    current = Path(index_dir).resolve() if Path(index_dir).is_symlink() else None
+    now = time.time()
+    versions = []
+    removed = []
+    for child in root.iterdir():
+        if not child.is_dir():
+            continue
+        if child.name.endswith(STAGING_SUFFIX):
+            if now - child.stat().st_mtime > STALE_STAGING_SECONDS:
+                shutil.rmtree(child, ignore_errors=True)
+                removed.append(child)
+            continue
+        versions.append(child)
+
+    versions.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for version in versions[max(1, keep):]:
+        if current is not None and version.resolve() == current:
+            continue
+        shutil.rmtree(version, ignore_errors=True)
+        removed.append(version)
+
+    for path in removed:
+        print(f"[versions] Removed {path.name}")
+    return removed
@@ -1,16 +1,41 @@
-import os
+import json
 import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Add server directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from prompts.ask import build_query_engine, route_question, query_with_mode, deduplicate_sources, save_prompt_history
+from config import INDEXES_DIR, INDEX_REPO_ROOT, WARMUP_ENABLED
+from indexing.jobs import IndexJobManager
+from indexing.symbols import SymbolTable
+from indexing.versions import find_indexes
+from prompts.profiling import RequestProfiler, should_profile
+from prompts.warmup import WarmupState, start_warmup
+from prompts.ask import get_query_engine, route_question, query_with_mode, deduplicate_sources, save_prompt_history, ask_batch, lookup_symbol, SYMBOL_LOOKUP_MODE
 
-app = FastAPI(title="REPO-QA API")
+index_jobs = IndexJobManager()
+warmup_state = WarmupState()
+
+PROFILE_HEADER_VALUES = {"1", "true", "yes"}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        # Runs in the background so /health answers while models load
+        start_warmup(warmup_state)
+    yield
+    index_jobs.shutdown()
+
+
+app = FastAPI(title="REPO-QA API", lifespan=lifespan)
 
 # CORS for local development
 app.add_middleware(
@@ -21,13 +46,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Path to indexes directory
-# Use environment variable if set, otherwise calculate relative path
-INDEXES_DIR = Path(os.getenv("INDEXES_DIR", str(Path(__file__).parent.parent / "indexes")))
-
 
-def get_index_path(index_name: str) -> Path:
-    """Validate index name and return a safe path under INDEXES_DIR."""
+def resolve_index_path(index_name: str) -> Path:
+    """Validate index name and return a safe path under INDEXES_DIR, existing or not."""
     name = (index_name or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="Index name is required")
@@ -36,12 +57,21 @@ def get_index_path(index_name: str) -> Path:
     if candidate.is_absolute() or ".." in candidate.parts or candidate.name != name:
         raise HTTPException(status_code=400, detail="Invalid index name")
 
-    index_path = (INDEXES_DIR / name).resolve()
+    index_path = INDEXES_DIR / name
     try:
-        index_path.relative_to(INDEXES_DIR.resolve())
+        index_path.resolve().relative_to(INDEXES_DIR.resolve())
     except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid index path") from exc
 
+    # Unresolved: a published index is a symlink, and builds must target the link, not its version dir
+    return index_path
+
+
+def get_index_path(index_name: str) -> Path:
+    """Validate index name and return the path of an existing index."""
+    index_path = resolve_index_path(index_name)
+    name = index_path.name
+
     if not index_path.exists():
         raise HTTPException(status_code=404, detail=f"Index '{name}' not found")
 
@@ -54,6 +84,8 @@ def get_index_path(index_name: str) -> Path:
 class AskRequest(BaseModel):
     index: str      # e.g., "gateway-service"
     question: str
+    stream: bool = False
+    profile: bool = False
 
 
 class AskResponse(BaseModel):
@@ -63,41 +95,73 @@ class AskResponse(BaseModel):
     confidence: float
 
 
+class AskBatchRequest(BaseModel):
+    index: str
+    questions: list[str]
+
+
 class IndexInfo(BaseModel):
     name: str
 
 
+class IndexJobRequest(BaseModel):
+    repo_path: str
+    index: str
+    ref: Optional[str] = None   # index this git commit/branch/tag instead of the working tree
+
+
 @app.get("/indexes", response_model=list[IndexInfo])
 def list_indexes():
     """List all available indexed repositories."""
-    if not INDEXES_DIR.exists():
-        return []
-
-    indexes = []
-    for item in INDEXES_DIR.iterdir():
-        if item.is_dir() and not item.name.startswith("."):
-            # Check if it has ChromaDB files (chroma.sqlite3)
-            if (item / "chroma.sqlite3").exists():
-                indexes.append(IndexInfo(name=item.name))
-
-    return indexes
+    return [IndexInfo(name=item.name) for item in find_indexes(INDEXES_DIR)]
 
 
 @app.post("/ask", response_model=AskResponse)
-def ask(request: AskRequest):
-    """Ask a question about a repository."""
+def ask(request: AskRequest, response: Response, x_profile: Optional[str] = Header(default=None)):
+    """Ask a question about a repository.
+
+    Set "profile": true or an X-Profile: 1 header to save a cProfile of the
+    request next to its prompt history entry.
+    """
     index_path = get_index_path(request.index)
+    requested = request.profile or (x_profile or "").lower() in PROFILE_HEADER_VALUES
+    profiler = RequestProfiler() if should_profile(requested) else None
 
+    retrieval = {}
     try:
-        # Route the question
-        mode, confidence = route_question(request.question)
+        with profiler.running() if profiler else nullcontext():
+            lookup = lookup_symbol(str(index_path), request.question)
+            if lookup is not None:
+                # Definition lookups are answered from the symbol table, no LLM involved
+                mode, confidence = SYMBOL_LOOKUP_MODE, 1.0
+                answer, sources = lookup
+                if request.stream:
+                    answer = iter([answer])
+            else:
+                # Route the question
+                mode, confidence = route_question(request.question)
+
+                # Build query engine and get answer
+                qe, collection = get_query_engine(str(index_path))
+                answer, sources = query_with_mode(qe, collection, request.question, mode, stream=request.stream,
+                                                  stats=retrieval)
+            sources = deduplicate_sources(sources)
 
-        # Build query engine and get answer
-        qe, collection = build_query_engine(str(index_path))
-        answer, sources = query_with_mode(qe, collection, request.question, mode)
-        sources = deduplicate_sources(sources)
+        if request.stream:
+            if profiler:
+                # Generation happens while the response streams, outside this handler
+                answer = profiler.profiled(answer)
+            return StreamingResponse(
+                stream_answer(answer, sources, request.question, str(index_path), mode, confidence, retrieval, profiler),
+                media_type="application/x-ndjson",
+            )
 
-        save_prompt_history(request.question, answer, sources, str(index_path), mode, confidence)
+        history_path = save_prompt_history(request.question, answer, sources, str(index_path), mode, confidence,
+                                           retrieval, profiler)
+        # Lets CLI clients print the same "[Saved to ...]" line as a local run
+        response.headers["X-Prompt-History"] = str(history_path)
+        if profiler:
+            response.headers["X-Profile"] = history_path.with_suffix(".prof").name
 
         return AskResponse(
             answer=answer,
@@ -113,7 +177,129 @@ def ask(request: AskRequest):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+def stream_answer(deltas, sources: list, question: str, index_dir: str, mode: str, confidence: float,
+                  retrieval: dict = None, profiler: Optional[RequestProfiler] = None):
+    """Yield NDJSON: a metadata line, then one line per answer delta, then a done line."""
+    yield json.dumps({"type": "meta", "sources": sources, "mode": mode, "confidence": confidence}) + "\n"
+    parts = []
+    try:
+        for delta in deltas:
+            parts.append(delta)
+            yield json.dumps({"type": "delta", "text": delta}) + "\n"
+    except Exception as e:
+        error_detail = f"{type(e).__name__}: {str(e)}"
+        print(f"Error in /ask stream: {error_detail}")
+        yield json.dumps({"type": "error", "detail": error_detail}) + "\n"
+        return
+
+    history_path = save_prompt_history(question, "".join(parts), sources, index_dir, mode, confidence, retrieval, profiler)
+    done = {"type": "done"}
+    if profiler:
+        done["profile"] = history_path.with_suffix(".prof").name
+    yield json.dumps(done) + "\n"
+
+
+@app.get("/indexes/{index}/symbols")
+def find_symbols(index: str, q: str, prefix: bool = False, kind: Optional[str] = None, limit: int = 20):
+    """Look up symbol definitions by exact (case-insensitive) name or prefix."""
+    index_path = get_index_path(index)
+    if not SymbolTable.exists(str(index_path)):
+        raise HTTPException(status_code=404, detail=f"Index '{index}' has no symbol table; rebuild it")
+
+    table = SymbolTable(str(index_path))
+    try:
+        return table.lookup(q, prefix=prefix, kind=kind, limit=max(1, min(limit, 200)))
+    finally:
+        table.close()
+
+
+@app.post("/ask/batch")
+def ask_batch_endpoint(request: AskBatchRequest):
+    """Ask many questions about one repository.
+
+    Streams newline-delimited JSON, one object per question in completion
+    order; each carries the question's position in the request as "id".
+    """
+    index_path = get_index_path(request.index)
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+
+    def stream():
+        try:
+            for result in ask_batch(str(index_path), request.questions):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            import traceback
+            error_detail = f"{type(e).__name__}: {str(e)}"
+            print(f"Error in /ask/batch: {error_detail}")
+            print(traceback.format_exc())
+            yield json.dumps({"error": error_detail}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/index/jobs")
+def submit_index_job(request: IndexJobRequest):
+    """Start building an index in the background and return the job."""
+    index_path = resolve_index_path(request.index)
+
+    # Relative paths are taken relative to INDEX_REPO_ROOT
+    repo = (INDEX_REPO_ROOT / Path(request.repo_path).expanduser()).resolve()
+    try:
+        repo.relative_to(INDEX_REPO_ROOT.resolve())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Repository path is outside INDEX_REPO_ROOT") from exc
+    if not repo.is_dir():
+        raise HTTPException(status_code=400, detail=f"Not a directory: {repo}")
+
+    return index_jobs.submit(str(repo), index_path.name, str(index_path), request.ref)
+
+
+@app.get("/index/jobs")
+def list_index_jobs():
+    """List background indexing jobs started since the server came up."""
+    return index_jobs.list()
+
+
+@app.get("/index/jobs/{job_id}")
+def get_index_job(job_id: str):
+    """Get the status and progress of an indexing job."""
+    job = index_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@app.get("/index/jobs/{job_id}/events")
+def stream_index_job(job_id: str, interval: float = 1.0):
+    """Stream NDJSON job snapshots every `interval` seconds until the job finishes."""
+    if index_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    def stream():
+        while True:
+            job = index_jobs.get(job_id)
+            yield json.dumps(job) + "\n"
+            if job["status"] in ("succeeded", "failed"):
+                return
+            time.sleep(max(0.2, interval))
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/health")
 def health():
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness endpoint: 200 once warmup has loaded engines and models, 503 before."""
+    if not WARMUP_ENABLED:
+        return {"status": "ready", "warmup": "disabled"}
+
+    snapshot = warmup_state.snapshot()
+    if not warmup_state.ready:
+        return JSONResponse(status_code=503, content=snapshot)
+    return snapshot
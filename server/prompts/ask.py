@@ -1,10 +1,24 @@
 import json
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+
+if __name__ == "__main__":
+    # Dispatch before the heavy imports below so client modes start fast (see prompts/client.py)
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from prompts.client import run_cli
+    raise SystemExit(run_cli(sys.argv[1:]))
 
 import chromadb
-from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core import PromptTemplate, Settings, StorageContext, VectorStoreIndex, get_response_synthesizer
+from llama_index.core.base.response.schema import Response
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import QueryBundle
 from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.llms.ollama import Ollama
 from llama_index.vector_stores.chroma import ChromaVectorStore
@@ -12,6 +26,10 @@ from llama_index.vector_stores.chroma import ChromaVectorStore
 # Import from server package
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+SYMBOL_LOOKUP_MODE = "symbol_lookup"
+# Modes answered without querying the vector store (see query_with_mode)
+NO_RETRIEVAL_MODES = {"generic", "repo_overview"}
+
 GENERIC_RESPONSE = "I'm a repository Q&A assistant. Ask me questions about the codebase, such as:\n- What does this repository do?\n- What endpoints does this service expose?\n- How does the authentication work?"
 
 from config import (
@@ -20,15 +38,28 @@ from config import (
     EMBEDDING_MODEL,
     LLM_MODEL,
     LLM_TIMEOUT,
-    SIMILARITY_TOP_K,
+    RETRIEVAL_CANDIDATES,
+    RERANK_ENABLED,
     ROUTER_CONFIDENCE_THRESHOLD,
+    ASK_BATCH_CONCURRENCY,
+    VECTOR_BACKEND,
+    SYMBOL_LOOKUP_ENABLED,
+    ENGINE_CACHE_SIZE,
+    OLLAMA_KEEP_ALIVE,
+    SYNTHESIS_STRATEGY,
+    RETRIEVAL_DEPTH,
     OPENAI_API_KEY,
     OPENAI_MODEL,
     OPENAI_BASE_URL,
     CLAUDE_API_KEY,
     CLAUDE_MODEL,
 )
-from .filters import ExcludeDeploymentFilesPostprocessor
+from indexing.mmap_index import has_export, load_index
+from indexing.versions import release_chroma
+from .client import print_answer
+from .filters import AdaptiveDepthPostprocessor, ExcludeDeploymentFilesPostprocessor, LexicalRerankPostprocessor
+from .retrievers import MmapRetriever
+from .symbol_lookup import answer_symbol_lookup
 from .router import QuestionRouter
 from .authoritative_sources import get_authoritative_context
 from .prompt_templates import get_prompt_template
@@ -64,13 +95,14 @@ def get_llm():
             model=LLM_MODEL,
             base_url=OLLAMA_BASE_URL,
             request_timeout=LLM_TIMEOUT,
+            keep_alive=OLLAMA_KEEP_ALIVE,
         )
 
     else:
         raise ValueError(f"Unknown MODE: {MODE}. Use 'ollama', 'openai', or 'claude'.")
 
 
-def build_query_engine(index_dir: str):
+def configure_models():
     # Embeddings always use Ollama
     Settings.embed_model = OllamaEmbedding(
         model_name=EMBEDDING_MODEL,
@@ -80,6 +112,19 @@ def build_query_engine(index_dir: str):
     # LLM based on MODE
     Settings.llm = get_llm()
 
+
+def build_query_engine(index_dir: str):
+    configure_models()
+
+    if VECTOR_BACKEND == "mmap" and has_export(index_dir):
+        # The mmap index doubles as the collection for authoritative source lookups
+        mmap_index = load_index(index_dir)
+        query_engine = RetrieverQueryEngine.from_args(
+            MmapRetriever(mmap_index, similarity_top_k=RETRIEVAL_CANDIDATES),
+            node_postprocessors=[ExcludeDeploymentFilesPostprocessor()],
+        )
+        return query_engine, mmap_index
+
     chroma_client = chromadb.PersistentClient(path=index_dir)
     collection = chroma_client.get_or_create_collection("repo_chunks")
 
@@ -92,17 +137,62 @@ def build_query_engine(index_dir: str):
     )
 
     query_engine = index.as_query_engine(
-        similarity_top_k=SIMILARITY_TOP_K,
+        similarity_top_k=RETRIEVAL_CANDIDATES,
         node_postprocessors=[ExcludeDeploymentFilesPostprocessor()],
     )
 
     return query_engine, collection
 
 
+_engine_cache: OrderedDict = OrderedDict()
+_engine_cache_lock = threading.Lock()
+
+
+def get_query_engine(index_dir: str):
+    """Return a cached (query_engine, collection) for index_dir, building it on first use.
+
+    Keyed by the resolved version directory, so publishing a rebuilt index
+    (a symlink swap) builds a fresh engine; entries for versions that were
+    garbage-collected are dropped. Dropped and evicted entries release their
+    Chroma client, which chromadb would otherwise keep open for good.
+    """
+    key = str(Path(index_dir).resolve())
+    with _engine_cache_lock:
+        dropped = [path for path in _engine_cache if not Path(path).exists()]
+        for stale in dropped:
+            del _engine_cache[stale]
+        engine = _engine_cache.get(key)
+        if engine is not None:
+            _engine_cache.move_to_end(key)
+    for path in dropped:
+        release_chroma(path)
+    if engine is not None:
+        return engine
+
+    engine = build_query_engine(key)
+    with _engine_cache_lock:
+        _engine_cache[key] = engine
+        evicted = []
+        while len(_engine_cache) > ENGINE_CACHE_SIZE:
+            evicted.append(_engine_cache.popitem(last=False)[0])
+    for path in evicted:
+        release_chroma(path)
+    return engine
+
+
 def route_question(question: str) -> tuple[str, float]:
     router = QuestionRouter()
     intent_type, confidence = router.classify_question(question)
+    return resolve_mode(intent_type, confidence)
+
+
+def route_questions(questions: list[str]) -> list[tuple[str, float]]:
+    router = QuestionRouter()
+    return [resolve_mode(intent_type, confidence)
+            for intent_type, confidence in router.classify_questions(questions)]
+
 
+def resolve_mode(intent_type: str, confidence: float) -> tuple[str, float]:
     if intent_type == "generic":
         return "generic", confidence
 
@@ -114,47 +204,172 @@ def route_question(question: str) -> tuple[str, float]:
     return mode, confidence
 
 
-def query_with_mode(query_engine, collection, question: str, mode: str) -> tuple[str, list]:
+def lookup_symbol(index_dir: str, question: str) -> Optional[tuple[str, list]]:
+    """Answer "where is X defined" questions from the index's symbol table, skipping routing and the LLM."""
+    if not SYMBOL_LOOKUP_ENABLED:
+        return None
+    return answer_symbol_lookup(index_dir, question)
+
+
+def query_with_mode(query_engine, collection, question: str, mode: str, query_embedding: list = None, stream: bool = False,
+                    stats: Optional[dict] = None) -> tuple:
+    """Answer a routed question and return (answer, sources).
+
+    With stream=True the answer is a generator of text deltas instead of a string.
+    If stats is given it is filled with per-stage chunk counts, latencies and context size.
+    """
     if mode == "generic":
-        return GENERIC_RESPONSE, []
+        return (iter([GENERIC_RESPONSE]) if stream else GENERIC_RESPONSE), []
 
     authoritative_context, authoritative_sources = get_authoritative_context(mode, collection)
 
-    if mode == "deep_dive":
-        response = query_engine.query(question)
-        return str(response), extract_sources(response)
+    # A precomputed embedding lets the retriever skip its own embed call
+    query = QueryBundle(query_str=question, embedding=query_embedding)
 
     if mode == "repo_overview":
         retrieved_context = ""
         response = None
     else:
-        response = query_engine.query(question)
-        max_chunks = 2 if mode == "repo_overview" else None
-        retrieved_context = format_retrieved_context(response, max_chunks=max_chunks)
+        # Retrieval only; synthesis below is done with our own prompt templates
+        started = time.perf_counter()
+        retrieved_nodes = query_engine.retrieve(query)
+        retrieve_ms = (time.perf_counter() - started) * 1000
+
+        # The depth cut runs on vector scores, before reranking. With the reranker on,
+        # only its hard limits apply so every candidate is rescored and RERANK_TOP_N decides the depth
+        depth = RETRIEVAL_DEPTH.get(mode, {})
+        if RERANK_ENABLED:
+            depth = {key: value for key, value in depth.items() if key not in ("max_distance_ratio", "max_gap_ratio")}
+        used_nodes = AdaptiveDepthPostprocessor(**depth).postprocess_nodes(retrieved_nodes, query)
+
+        rerank = None
+        if RERANK_ENABLED:
+            started = time.perf_counter()
+            candidates = used_nodes
+            used_nodes = LexicalRerankPostprocessor().postprocess_nodes(candidates, query)
+            rerank = {
+                "kept": len(used_nodes),
+                "dropped": len(candidates) - len(used_nodes),
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+
+        response = Response(response=None, source_nodes=used_nodes)
+        retrieved_context = format_retrieved_context(response)
+        if stats is not None:
+            stats.update({
+                "retrieved": len(retrieved_nodes),
+                "retrieve_ms": round(retrieve_ms, 2),
+                "used": len(used_nodes),
+                "context_chars": len(retrieved_context),
+            })
+            if rerank:
+                stats["rerank"] = rerank
+        print(
+            f"[retrieval] mode={mode} retrieved={len(retrieved_nodes)} ({retrieve_ms:.1f}ms)"
+            + (f" reranked kept={rerank['kept']} dropped={rerank['dropped']} ({rerank['ms']:.1f}ms)" if rerank else "")
+            + f" used={len(used_nodes)} context_chars={len(retrieved_context)}"
+        )
+
+    # Combine authoritative sources with retrieved sources
+    retrieved_sources = extract_sources(response) if response else []
+    sources = authoritative_sources + retrieved_sources
 
     prompt_template = get_prompt_template(mode)
 
-    if mode == "deep_dive":
-        final_prompt = prompt_template.format(
-            retrieved_context=retrieved_context,
-            question=question
-        )
-    else:
-        final_prompt = prompt_template.format(
-            authoritative_context=authoritative_context,
-            retrieved_context=retrieved_context,
-            question=question
+    strategy = SYNTHESIS_STRATEGY.get(mode, "single")
+    if strategy != "single" and response is not None:
+        answer = synthesize_with_llama_index(
+            prompt_template, authoritative_context, query, response.source_nodes, strategy, stream
         )
+        return answer, sources
+
+    # deep_dive's template has no authoritative section; str.format ignores the extra key
+    final_prompt = prompt_template.format(
+        authoritative_context=authoritative_context,
+        retrieved_context=retrieved_context,
+        question=question
+    )
 
     llm = Settings.llm
-    final_response = llm.complete(final_prompt)
+    if stream:
+        return (chunk.delta or "" for chunk in llm.stream_complete(final_prompt)), sources
 
-    # Combine authoritative sources with retrieved sources
-    retrieved_sources = extract_sources(response) if response else []
-    sources = authoritative_sources + retrieved_sources
+    final_response = llm.complete(final_prompt)
     return str(final_response), sources
 
 
+def synthesize_with_llama_index(prompt_template: str, authoritative_context: str, query: QueryBundle, nodes: list, response_mode: str, stream: bool = False):
+    """Run llama_index's response synthesizer (may make several LLM calls) over our template."""
+    text_qa_template = PromptTemplate(
+        prompt_template,
+        template_var_mappings={"context_str": "retrieved_context", "query_str": "question"},
+    )
+    if "{authoritative_context}" in prompt_template:
+        text_qa_template = text_qa_template.partial_format(authoritative_context=authoritative_context)
+    synthesizer = get_response_synthesizer(
+        response_mode=response_mode,
+        text_qa_template=text_qa_template,
+        streaming=stream,
+    )
+    response = synthesizer.synthesize(query, nodes=nodes)
+    if stream:
+        return response.response_gen
+    return str(response)
+
+
+def ask_batch(index_dir: str, questions: list[str], max_workers: int = ASK_BATCH_CONCURRENCY):
+    """Answer many questions against one index, yielding results as each finishes.
+
+    Routing is done in multi-question router calls, query embeddings in one
+    batch, and the query engine is built once and shared by all workers.
+    """
+    lookups = {}
+    for i, question in enumerate(questions):
+        lookup = lookup_symbol(index_dir, question)
+        if lookup is not None:
+            lookups[i] = lookup
+
+    # Only questions the symbol table could not answer need routing
+    pending = [i for i in range(len(questions)) if i not in lookups]
+    routes = dict(zip(pending, route_questions([questions[i] for i in pending]))) if pending else {}
+    qe, collection = get_query_engine(index_dir)
+
+    # Embed every question that will hit the vector store in one batch
+    to_embed = [i for i, (mode, _) in routes.items() if mode not in NO_RETRIEVAL_MODES]
+    embeddings = {}
+    if to_embed:
+        vectors = Settings.embed_model.get_text_embedding_batch([questions[i] for i in to_embed])
+        embeddings = dict(zip(to_embed, vectors))
+
+    def answer(i: int) -> dict:
+        question = questions[i]
+        retrieval = {}
+        if i in lookups:
+            mode, confidence = SYMBOL_LOOKUP_MODE, 1.0
+            answer_text, sources = lookups[i]
+        else:
+            mode, confidence = routes[i]
+            answer_text, sources = query_with_mode(qe, collection, question, mode, embeddings.get(i), stats=retrieval)
+        sources = deduplicate_sources(sources)
+        save_prompt_history(question, answer_text, sources, index_dir, mode, confidence, retrieval)
+        return {
+            "answer": answer_text,
+            "sources": sources,
+            "mode": mode,
+            "confidence": confidence,
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(answer, i): i for i in range(len(questions))}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {str(e)}"}
+            yield {"id": i, "question": questions[i], **result}
+
+
 def format_retrieved_context(response, max_chunks=None) -> str:
     if not getattr(response, "source_nodes", None):
         return "[No retrieved context]"
@@ -206,7 +421,9 @@ def deduplicate_sources(sources: list) -> list:
     return list(seen.values())
 
 
-def save_prompt_history(question: str, answer: str, sources: list, index_dir: str, mode: str = None, confidence: float = None):
+def save_prompt_history(question: str, answer: str, sources: list, index_dir: str, mode: str = None, confidence: float = None,
+                        retrieval: dict = None, profiler=None) -> Path:
+    """Write one prompt history entry, plus <timestamp>.prof when a RequestProfiler is given."""
     history_dir = Path(__file__).parent.parent / "prompts_history"
     history_dir.mkdir(exist_ok=True)
 
@@ -225,43 +442,45 @@ def save_prompt_history(question: str, answer: str, sources: list, index_dir: st
         data["mode"] = mode
     if confidence is not None:
         data["confidence"] = confidence
+    if retrieval:
+        data["retrieval"] = retrieval
+    if profiler is not None:
+        data["profile"] = profiler.save(history_dir / f"{timestamp}.prof")
 
     filepath = history_dir / filename
     with open(filepath, "w") as f:
         json.dump(data, f, indent=2)
 
     print(f"\n[Saved to {filepath}]")
+    return filepath
 
 
-def main(index_dir: str, question: str) -> str:
-    mode, confidence = route_question(question)
-
-    qe, collection = build_query_engine(index_dir)
-
-    answer, sources = query_with_mode(qe, collection, question, mode)
-    sources = deduplicate_sources(sources)
-
-    print("\nANSWER:\n")
-    print(answer)
-
-    print("\nSOURCES:\n")
-    if sources:
-        for i, source in enumerate(sources, start=1):
-            file_path = source["file_path"]
-            score = source.get("score")
-            print(f"{i}. {file_path}" + (f" (score={score:.4g})" if score is not None else ""))
+def answer_question(index_dir: str, question: str) -> dict:
+    """Answer one question with the cached engine for index_dir, without saving history."""
+    retrieval = {}
+    lookup = lookup_symbol(index_dir, question)
+    if lookup is not None:
+        mode, confidence = SYMBOL_LOOKUP_MODE, 1.0
+        answer, sources = lookup
     else:
-        print("No sources returned.")
+        mode, confidence = route_question(question)
 
-    save_prompt_history(question, answer, sources, index_dir, mode, confidence)
+        qe, collection = get_query_engine(index_dir)
 
-    return answer
+        answer, sources = query_with_mode(qe, collection, question, mode, stats=retrieval)
 
+    return {
+        "answer": answer,
+        "sources": deduplicate_sources(sources),
+        "mode": mode,
+        "confidence": confidence,
+        "retrieval": retrieval,
+    }
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        raise SystemExit('Usage: python prompts/ask.py ./indexes/gateway-service "your question here"')
 
-    index_dir = sys.argv[1]
-    question = " ".join(sys.argv[2:])
-    main(index_dir, question)
+def main(index_dir: str, question: str) -> str:
+    result = answer_question(index_dir, question)
+    print_answer(result["answer"], result["sources"])
+    save_prompt_history(question, result["answer"], result["sources"], index_dir,
+                        result["mode"], result["confidence"], result["retrieval"])
+    return result["answer"]
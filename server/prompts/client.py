@@ -0,0 +1,130 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+# Only stdlib and config here: client modes must not pay for chromadb/llama_index imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import ASK_CLIENT_MODE, ASK_DAEMON_SOCKET, ASK_DAEMON_START_TIMEOUT, REPO_QA_URL
+
+USAGE = 'Usage: python prompts/ask.py ./indexes/gateway-service "your question here"'
+
+
+def print_answer(answer: str, sources: list, history_path: Optional[str] = None):
+    print("\nANSWER:\n")
+    print(answer)
+
+    print("\nSOURCES:\n")
+    if sources:
+        for i, source in enumerate(sources, start=1):
+            file_path = source["file_path"]
+            score = source.get("score")
+            print(f"{i}. {file_path}" + (f" (score={score:.4g})" if score is not None else ""))
+    else:
+        print("No sources returned.")
+
+    if history_path:
+        print(f"\n[Saved to {history_path}]")
+
+
+def ask_server(index_dir: str, question: str, url: str = REPO_QA_URL) -> dict:
+    """Ask a running REPO-QA API; the index is addressed by its directory name."""
+    payload = json.dumps({"index": Path(index_dir).name, "question": question}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/ask", data=payload, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.load(response)
+            # Path on the server's filesystem, as printed by the server itself
+            result["history"] = response.headers.get("X-Prompt-History")
+            return result
+    except urllib.error.HTTPError as exc:
+        try:
+            detail = json.load(exc).get("detail")
+        except ValueError:
+            detail = exc.reason
+        raise SystemExit(f"REPO-QA server error ({exc.code}): {detail}")
+    except urllib.error.URLError as exc:
+        raise SystemExit(f"Cannot reach REPO-QA server at {url}: {exc.reason}")
+
+
+def _request_daemon(message: dict, socket_path: str) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise SystemExit("Ask daemon closed the connection without answering")
+    return json.loads(line)
+
+
+def start_daemon(socket_path: str = ASK_DAEMON_SOCKET):
+    """Spawn prompts/daemon.py in the background and wait until it accepts connections."""
+    log_path = f"{socket_path}.log"
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).parent / "daemon.py"), socket_path],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + ASK_DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        # A daemon that lost a start race to another client's exits, but that one's socket exists
+        if process.poll() is not None and not os.path.exists(socket_path):
+            raise SystemExit(f"Ask daemon exited during startup; see {log_path}")
+        time.sleep(0.2)
+    raise SystemExit(f"Ask daemon did not start within {ASK_DAEMON_START_TIMEOUT}s; see {log_path}")
+
+
+def ask_daemon(index_dir: str, question: str, socket_path: str = ASK_DAEMON_SOCKET) -> dict:
+    """Ask the local daemon, starting it first if it is not running."""
+    message = {"index_dir": os.path.abspath(index_dir), "question": question}
+    try:
+        reply = _request_daemon(message, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        start_daemon(socket_path)
+        reply = _request_daemon(message, socket_path)
+
+    if "error" in reply:
+        raise SystemExit(f"Ask daemon error: {reply['error']}")
+    return reply
+
+
+def run_cli(argv: list[str]) -> int:
+    if len(argv) < 2:
+        raise SystemExit(USAGE)
+
+    index_dir = argv[0]
+    question = " ".join(argv[1:])
+
+    if ASK_CLIENT_MODE == "local":
+        from prompts.ask import main
+        main(index_dir, question)
+        return 0
+    if ASK_CLIENT_MODE == "server":
+        result = ask_server(index_dir, question)
+    elif ASK_CLIENT_MODE == "daemon":
+        result = ask_daemon(index_dir, question)
+    else:
+        raise SystemExit(f"Unknown ASK_CLIENT_MODE: {ASK_CLIENT_MODE}. Use local, server or daemon.")
+
+    print_answer(result["answer"], result["sources"], result.get("history"))
+    return 0
@@ -0,0 +1,99 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import ASK_DAEMON_IDLE_SECONDS, ASK_DAEMON_SOCKET
+from prompts.ask import answer_question, configure_models, save_prompt_history
+
+
+class AskDaemon(socketserver.ThreadingUnixStreamServer):
+    """Answers CLI questions over a Unix socket, one JSON line in and one out.
+
+    Models and query engines stay loaded between questions (see
+    get_query_engine); the process exits after idle_seconds without requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, idle_seconds: int = ASK_DAEMON_IDLE_SECONDS):
+        super().__init__(socket_path, AskHandler)
+        self.idle_seconds = idle_seconds
+        self.active = 0
+        self.last_request = time.monotonic()
+        self._lock = threading.Lock()
+
+    def track(self, delta: int):
+        with self._lock:
+            self.active += delta
+            self.last_request = time.monotonic()
+
+    def watch_idle(self):
+        while True:
+            time.sleep(min(5, self.idle_seconds))
+            with self._lock:
+                idle = self.active == 0 and time.monotonic() - self.last_request > self.idle_seconds
+            if idle:
+                print(f"[daemon] Idle for {self.idle_seconds}s, exiting", flush=True)
+                self.shutdown()
+                return
+
+
+class AskHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.server.track(1)
+        try:
+            request = json.loads(self.rfile.readline())
+            index_dir, question = request["index_dir"], request["question"]
+            result = answer_question(index_dir, question)
+            history = save_prompt_history(question, result["answer"], result["sources"], index_dir,
+                                          result["mode"], result["confidence"], result["retrieval"])
+            reply = {
+                "answer": result["answer"],
+                "sources": result["sources"],
+                "mode": result["mode"],
+                "confidence": result["confidence"],
+                "history": str(history),
+            }
+        except Exception as exc:
+            print(traceback.format_exc(), flush=True)
+            reply = {"error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            self.server.track(-1)
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+def serve(socket_path: str = ASK_DAEMON_SOCKET):
+    if os.path.exists(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+            print(f"[daemon] Already running on {socket_path}", flush=True)
+            return
+        except ConnectionRefusedError:
+            # Left behind by a daemon that was killed
+            os.unlink(socket_path)
+
+    configure_models()
+    server = AskDaemon(socket_path)
+    os.chmod(socket_path, 0o600)
+    threading.Thread(target=server.watch_idle, daemon=True).start()
+    print(f"[daemon] Listening on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else ASK_DAEMON_SOCKET)
@@ -1,3 +1,5 @@
+import math
+import re
 import sys
 from pathlib import Path
 from typing import Optional
@@ -7,7 +9,16 @@ from llama_index.core.schema import NodeWithScore, QueryBundle
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import DEPLOYMENT_FILE_PATTERNS
+from config import DEPLOYMENT_FILE_PATTERNS, RERANK_TOP_N, SIMILARITY_TOP_K
+
+# Words (including camelCase / snake_case parts) and numbers
+_TERM_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "what", "when", "where", "which", "who",
+    "why", "with", "you", "we", "there", "code", "repo", "repository",
+}
+_TEST_TERMS = {"test", "tests", "spec", "specs", "mock", "mocks", "fixture", "fixtures", "stub", "stubs"}
 
 
 def should_exclude_file(file_path: str) -> bool:
@@ -27,3 +38,105 @@ class ExcludeDeploymentFilesPostprocessor(BaseNodePostprocessor):
                 (node.node.metadata or {}).get("filename") or ""
             )
         ]
+
+
+def _terms(text: str) -> set[str]:
+    terms = set()
+    for term in _TERM_PATTERN.findall(text or ""):
+        term = term.lower()
+        if len(term) > 1 and term not in _STOPWORDS:
+            terms.add(term)
+    return terms
+
+
+def _distance(score: float) -> float:
+    """Squared L2 distance back from a vector store score of exp(-distance)."""
+    return -math.log(score) if score > 0 else math.inf
+
+
+def _match(query_terms: set[str], text: str) -> float:
+    """Share of query terms that appear in text."""
+    return len(query_terms & _terms(text)) / len(query_terms)
+
+
+class LexicalRerankPostprocessor(BaseNodePostprocessor):
+    """Second retrieval stage: rescore over-fetched nodes on the CPU and keep the best top_n.
+
+    The new score mixes each node's vector similarity (the best node's distance
+    over its own, which doesn't depend on the embedding norm) with the share
+    of question terms found in its text, its file summary and the last path
+    components. Test and fixture files are demoted unless the
+    question is about tests.
+    """
+
+    top_n: int = RERANK_TOP_N
+    vector_weight: float = 0.5
+    text_weight: float = 0.25
+    summary_weight: float = 0.1
+    path_weight: float = 0.15
+    test_penalty: float = 0.5
+
+    def _postprocess_nodes(
+        self, nodes: list[NodeWithScore], query_bundle: Optional[QueryBundle] = None
+    ) -> list[NodeWithScore]:
+        if not nodes:
+            return []
+        query_terms = _terms(query_bundle.query_str) if query_bundle else set()
+        wants_tests = bool(query_terms & _TEST_TERMS)
+        top_distance = min(_distance(node.score or 0.0) for node in nodes)
+
+        rescored = []
+        for node in nodes:
+            meta = node.node.metadata or {}
+            path = meta.get("file_path") or meta.get("filename") or ""
+            path_terms = _terms(" ".join(Path(path).parts[-3:]))
+
+            distance = _distance(node.score or 0.0)
+            score = self.vector_weight * (1.0 if distance <= top_distance else top_distance / distance)
+            if query_terms:
+                score += self.text_weight * _match(query_terms, node.node.get_content())
+                score += self.summary_weight * _match(query_terms, meta.get("file_summary", ""))
+                score += self.path_weight * len(query_terms & path_terms) / len(query_terms)
+            if not wants_tests and path_terms & _TEST_TERMS:
+                score *= self.test_penalty
+            rescored.append(NodeWithScore(node=node.node, score=score))
+
+        rescored.sort(key=lambda node: node.score, reverse=True)
+        return rescored[:self.top_n]
+
+
+class AdaptiveDepthPostprocessor(BaseNodePostprocessor):
+    """Trim retrieved nodes to between min_k and max_k using their scores.
+
+    After min_k nodes, the list is cut at the first node that scores below
+    min_score, lies more than max_distance_ratio times as far from the query as
+    the top node, or more than max_gap_ratio times as far as the previous node
+    (a sharp drop in relevance). Distance ratios don't depend on the embedding
+    norm, unlike ratios of exp(-distance) scores.
+    """
+
+    min_k: int = 1
+    max_k: int = SIMILARITY_TOP_K
+    min_score: Optional[float] = None
+    max_distance_ratio: Optional[float] = None
+    max_gap_ratio: Optional[float] = None
+
+    def _postprocess_nodes(
+        self, nodes: list[NodeWithScore], query_bundle: Optional[QueryBundle] = None
+    ) -> list[NodeWithScore]:
+        top_distance = _distance(nodes[0].score) if nodes and nodes[0].score is not None else None
+        kept = []
+        for node in nodes[:self.max_k]:
+            if len(kept) >= self.min_k and node.score is not None:
+                if self.min_score is not None and node.score < self.min_score:
+                    break
+                distance = _distance(node.score)
+                if (self.max_distance_ratio is not None and top_distance is not None
+                        and distance > top_distance * self.max_distance_ratio):
+                    break
+                previous = kept[-1].score if kept else None
+                if (self.max_gap_ratio is not None and previous is not None
+                        and distance > _distance(previous) * self.max_gap_ratio):
+                    break
+            kept.append(node)
+        return kept
@@ -0,0 +1,73 @@
+import cProfile
+import io
+import pstats
+import random
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import PROFILE_SAMPLE_RATE, PROFILE_TOP_N
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Profile when the caller asked for it, or for a PROFILE_SAMPLE_RATE share of requests."""
+    return requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+class RequestProfiler:
+    """cProfile of one request, resumable across threads.
+
+    cProfile only sees the thread that enabled it, so a streamed answer is
+    profiled by wrapping each step of its generator in running() as well.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.wall_seconds = 0.0
+
+    @contextmanager
+    def running(self):
+        started = time.perf_counter()
+        self.profile.enable()
+        try:
+            yield self
+        finally:
+            self.profile.disable()
+            self.wall_seconds += time.perf_counter() - started
+
+    def profiled(self, iterator):
+        """Yield from iterator with the profiler enabled while producing each item."""
+        iterator = iter(iterator)
+        while True:
+            with self.running():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def save(self, path: Path, top_n: int = PROFILE_TOP_N) -> dict:
+        """Dump the raw profile to path (for pstats/snakeviz) and return a summary of the hottest calls."""
+        self.profile.dump_stats(str(path))
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+
+        top = []
+        for func in stats.fcn_list[:top_n]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            top.append({
+                "function": f"{filename}:{line}({name})",
+                "calls": ncalls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+
+        return {
+            "file": path.name,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "top": top,
+        }
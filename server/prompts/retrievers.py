@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+from llama_index.core import Settings
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from indexing.mmap_index import MmapVectorIndex
+
+
+class MmapRetriever(BaseRetriever):
+    """Retrieve nodes from a memory-mapped export instead of a Chroma collection."""
+
+    def __init__(self, index: MmapVectorIndex, similarity_top_k: int):
+        self._index = index
+        self._similarity_top_k = similarity_top_k
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        embedding = query_bundle.embedding
+        if embedding is None:
+            embedding = Settings.embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+
+        hits = self._index.search(embedding, self._similarity_top_k)
+        chunks = self._index.rows([row for row, _ in hits])
+
+        results = []
+        for (_, score), (chunk_id, text, metadata) in zip(hits, chunks):
+            try:
+                node = metadata_dict_to_node(metadata)
+                node.set_content(text)
+            except Exception:
+                node = TextNode(text=text, id_=chunk_id, metadata=metadata)
+            results.append(NodeWithScore(node=node, score=score))
+        return results
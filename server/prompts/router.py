@@ -9,7 +9,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config import (
     MODE,
+    ROUTER_BATCH_SIZE,
     OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
     ROUTER_MODEL,
     OPENAI_API_KEY,
     OPENAI_MODEL,
@@ -24,10 +26,8 @@ QuestionIntent = Literal["repo_overview", "api_endpoints", "deep_dive", "generic
 
 class QuestionRouter:
 
-    ROUTER_PROMPT = """You are a question classifier for a repository Q&A system.
-Classify the user's question into ONE of these intents:
-
-1. "generic" - Greetings, small talk, or questions NOT related to any codebase
+    # Shared by the single and batch prompts so a question routes the same either way
+    INTENTS = """1. "generic" - Greetings, small talk, or questions NOT related to any codebase
    Examples:
    - "Hello", "Hi", "Hey"
    - "How are you?"
@@ -57,7 +57,12 @@ Classify the user's question into ONE of these intents:
    - "How does the authentication module work?"
    - "Where is the login function defined?"
    - "What causes error X?"
-   - "How do I configure feature Y?"
+   - "How do I configure feature Y?\""""
+
+    ROUTER_PROMPT = """You are a question classifier for a repository Q&A system.
+Classify the user's question into ONE of these intents:
+
+""" + INTENTS + """
 
 Respond with ONLY valid JSON in this exact format:
 {{
@@ -67,6 +72,21 @@ Respond with ONLY valid JSON in this exact format:
 
 Question: {question}
 
+JSON Response:"""
+
+    BATCH_ROUTER_PROMPT = """You are a question classifier for a repository Q&A system.
+Classify EACH of the numbered questions below into ONE of these intents:
+
+""" + INTENTS + """
+
+Respond with ONLY a valid JSON array containing one object per question, in this exact format:
+[
+  {{"id": 1, "type": "generic" | "repo_overview" | "api_endpoints" | "deep_dive", "confidence": 0.0-1.0}}
+]
+
+Questions:
+{questions}
+
 JSON Response:"""
 
     def __init__(self):
@@ -99,6 +119,7 @@ JSON Response:"""
                 model=ROUTER_MODEL,
                 base_url=OLLAMA_BASE_URL,
                 request_timeout=30.0,
+                keep_alive=OLLAMA_KEEP_ALIVE,
             )
 
     def classify_question(self, question: str) -> tuple[QuestionIntent, float]:
@@ -117,15 +138,68 @@ JSON Response:"""
             json_str = response_text[start_idx:end_idx + 1]
             result = json.loads(json_str)
 
-            intent_type = result.get("type", "deep_dive")
-            confidence = float(result.get("confidence", 0.5))
+            return self._parse_intent(result)
+
+        except Exception:
+            return "deep_dive", 0.5
+
+    def classify_questions(self, questions: list[str]) -> list[tuple[QuestionIntent, float]]:
+        """Classify many questions with one LLM call per ROUTER_BATCH_SIZE questions."""
+        results = []
+        for start in range(0, len(questions), ROUTER_BATCH_SIZE):
+            results.extend(self._classify_batch(questions[start:start + ROUTER_BATCH_SIZE]))
+        return results
+
+    def _classify_batch(self, questions: list[str]) -> list[tuple[QuestionIntent, float]]:
+        fallback = [("deep_dive", 0.5)] * len(questions)
+        if len(questions) == 1:
+            return [self.classify_question(questions[0])]
 
-            if intent_type not in ["generic", "repo_overview", "api_endpoints", "deep_dive"]:
-                intent_type = "deep_dive"
+        numbered = "\n".join(
+            f"{i}. {' '.join(question.split())}" for i, question in enumerate(questions, start=1)
+        )
+        prompt = self.BATCH_ROUTER_PROMPT.format(questions=numbered)
+
+        try:
+            response = self.llm.complete(prompt)
+            response_text = str(response).strip()
 
-            confidence = max(0.0, min(1.0, confidence))
+            start_idx = response_text.find('[')
+            end_idx = response_text.rfind(']')
 
-            return intent_type, confidence
+            if start_idx == -1 or end_idx == -1:
+                return fallback
+
+            items = json.loads(response_text[start_idx:end_idx + 1])
+
+            results = list(fallback)
+            for position, item in enumerate(items):
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    slot = int(item.get("id", position + 1)) - 1
+                except (TypeError, ValueError):
+                    slot = position
+                if 0 <= slot < len(questions):
+                    try:
+                        results[slot] = self._parse_intent(item)
+                    except (TypeError, ValueError):
+                        # A malformed item (e.g. "confidence": "high") only falls back for its own question
+                        continue
+
+            return results
 
         except Exception:
-            return "deep_dive", 0.5
+            return fallback
+
+    @staticmethod
+    def _parse_intent(result: dict) -> tuple[QuestionIntent, float]:
+        intent_type = result.get("type", "deep_dive")
+        confidence = float(result.get("confidence", 0.5))
+
+        if intent_type not in ["generic", "repo_overview", "api_endpoints", "deep_dive"]:
+            intent_type = "deep_dive"
+
+        confidence = max(0.0, min(1.0, confidence))
+
+        return intent_type, confidence
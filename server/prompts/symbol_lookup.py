@@ -0,0 +1,90 @@
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from indexing.symbols import SymbolTable
+
+MAX_LOOKUP_RESULTS = 10
+
+_KIND_WORDS = {
+    "function": "function",
+    "func": "function",
+    "method": "method",
+    "class": "class",
+    "interface": "interface",
+    "type": "type",
+    "enum": "enum",
+    "struct": "type",
+    "constructor": "constructor",
+}
+_KIND = r"(?:function|func|method|class|interface|type|enum|struct|constructor)"
+_NAME = r"`?(?P<name>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)`?(?:\(\))?"
+_SUBJECT = rf"(?:the\s+)?(?:(?P<kind_before>{_KIND})\s+)?{_NAME}(?:\s+(?P<kind_after>{_KIND}))?"
+
+# Pure "where is X defined" questions; anything else goes through retrieval
+LOOKUP_PATTERNS = [
+    re.compile(rf"^\s*where\s+(?:is|are)\s+{_SUBJECT}\s+(?:defined|declared|implemented|located)\s*\??\s*$", re.I),
+    re.compile(rf"^\s*where\s+(?:can\s+i\s+find|do\s+i\s+find|does)\s+{_SUBJECT}(?:\s+live)?\s*\??\s*$", re.I),
+    re.compile(rf"^\s*(?:find|show(?:\s+me)?|go\s+to)\s+(?:the\s+)?definition\s+of\s+{_SUBJECT}\s*\??\s*$", re.I),
+    re.compile(rf"^\s*(?:which|what)\s+file\s+(?:defines|declares|contains)\s+{_SUBJECT}\s*\??\s*$", re.I),
+    re.compile(rf"^\s*(?:which|what)\s+file\s+is\s+{_SUBJECT}\s+(?:defined|declared)\s+in\s*\??\s*$", re.I),
+]
+
+
+def parse_lookup_question(question: str) -> Optional[dict]:
+    """Return {"name", "parent", "kind"} if question only asks where a symbol is defined."""
+    for pattern in LOOKUP_PATTERNS:
+        match = pattern.match(question)
+        if not match:
+            continue
+        parts = match.group("name").split(".")
+        kind_word = (match.group("kind_before") or match.group("kind_after") or "").lower()
+        return {
+            "name": parts[-1],
+            "parent": parts[-2] if len(parts) > 1 else None,
+            "kind": _KIND_WORDS.get(kind_word),
+        }
+    return None
+
+
+def answer_symbol_lookup(index_dir: str, question: str) -> Optional[tuple[str, list]]:
+    """Answer a definition-lookup question from the symbol table.
+
+    Returns (answer, sources), or None when the question is not a lookup or the
+    symbol is unknown, so the caller can fall back to the normal pipeline.
+    """
+    lookup = parse_lookup_question(question)
+    if lookup is None or not SymbolTable.exists(index_dir):
+        return None
+
+    table = SymbolTable(index_dir)
+    try:
+        matches = table.lookup(lookup["name"], kind=lookup["kind"], parent=lookup["parent"], limit=MAX_LOOKUP_RESULTS)
+        if not matches and (lookup["kind"] or lookup["parent"]):
+            # The question's wording of the kind/owner may not match the parser's
+            matches = table.lookup(lookup["name"], limit=MAX_LOOKUP_RESULTS)
+    finally:
+        table.close()
+
+    if not matches:
+        return None
+
+    return format_symbol_answer(lookup["name"], matches), [
+        {"file_path": match["file_path"], "score": None} for match in matches
+    ]
+
+
+def format_symbol_answer(name: str, matches: list[dict]) -> str:
+    lines = [f"`{name}` is defined in:", ""]
+    for match in matches:
+        owner = f"{match['parent']}." if match["parent"] else ""
+        lines.append(
+            f"- `{match['relative_path']}` lines {match['start_line']}-{match['end_line']} "
+            f"({match['kind']} `{owner}{match['name']}`)"
+        )
+        if match["signature"]:
+            lines.append(f"  `{match['signature']}`")
+    return "\n".join(lines)
@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from llama_index.core import Settings
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import (
+    MODE,
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    EMBEDDING_MODEL,
+    INDEXES_DIR,
+    WARMUP_INDEXES,
+    WARMUP_RETRY_SECONDS,
+)
+from indexing.versions import find_indexes
+from .ask import configure_models, get_query_engine
+from .router import QuestionRouter
+
+
+class WarmupState:
+    """Tracks startup warmup so /ready can report whether this instance is warm."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "pending"
+        self.steps: dict = {}
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def record(self, step: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            self.steps[step] = {"seconds": round(seconds, 3), "error": error}
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status == "running":
+                self.attempts += 1
+                self.started_at = self.started_at or time.time()
+            if status == "ready":
+                self.finished_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "attempts": self.attempts,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "steps": {name: dict(step) for name, step in self.steps.items()},
+            }
+
+
+def _timed(state: WarmupState, step: str, fn, required: bool = True):
+    """Run one warmup step; only a required step's failure fails the warmup."""
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        state.record(step, time.perf_counter() - start, error)
+        if required:
+            raise
+        print(f"[warmup] {step} failed ({error}), continuing")
+        return
+    state.record(step, time.perf_counter() - start)
+
+
+def _warm_embedding_model():
+    # OllamaEmbedding cannot pass keep_alive, so load the model with the client directly
+    import ollama
+
+    ollama.Client(host=OLLAMA_BASE_URL).embeddings(
+        model=EMBEDDING_MODEL, prompt="warmup", keep_alive=OLLAMA_KEEP_ALIVE
+    )
+
+
+def run_warmup(state: WarmupState, index_names: Optional[list[str]] = None):
+    """Preload query engines and load the embedding, answer and router models once."""
+    state.set_status("running")
+
+    indexes = find_indexes(INDEXES_DIR)
+    names = index_names or WARMUP_INDEXES
+    if names:
+        indexes = [path for path in indexes if path.name in names]
+
+    _timed(state, "models", configure_models)
+    # A broken index must not keep the whole instance out of rotation; it fails on its own /ask
+    for index_path in indexes:
+        _timed(state, f"engine:{index_path.name}", lambda path=index_path: get_query_engine(str(path)),
+               required=False)
+
+    if MODE == "ollama":
+        _timed(state, "embedding_model", _warm_embedding_model)
+    _timed(state, "query_embedding", lambda: Settings.embed_model.get_query_embedding("warmup"))
+    _timed(state, "llm", lambda: Settings.llm.complete("Reply with OK."))
+    _timed(state, "router", lambda: QuestionRouter().llm.complete("Reply with OK."))
+
+    state.set_status("ready")
+
+
+def start_warmup(state: WarmupState) -> threading.Thread:
+    """Run warmup in a background thread, retrying until it succeeds."""
+
+    def loop():
+        while True:
+            try:
+                run_warmup(state)
+                print(f"[warmup] Ready after {state.attempts} attempt(s)")
+                return
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                state.set_status("failed", error)
+                print(f"[warmup] Failed ({error}), retrying in {WARMUP_RETRY_SECONDS:.0f}s")
+                time.sleep(WARMUP_RETRY_SECONDS)
+
+    thread = threading.Thread(target=loop, name="warmup", daemon=True)
+    thread.start()
+    return thread
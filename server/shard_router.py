@@ -0,0 +1,247 @@
+import hashlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Add server directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import SHARD_NODES, SHARD_REFRESH_SECONDS, SHARD_REQUEST_TIMEOUT
+
+# Node response headers passed through to the caller
+FORWARDED_HEADERS = ("x-profile", "x-prompt-history")
+# Unknown index names re-list the nodes at most this often
+MISS_REFRESH_SECONDS = 2.0
+LIST_TIMEOUT = 5.0
+
+
+class ShardMap:
+    """Which node serves each index, learned from the nodes' GET /indexes.
+
+    An index listed by several nodes is served by the first of them in
+    SHARD_NODES order. New indexes are placed by rendezvous hashing, so adding
+    a node only moves the indexes that hash to it.
+    """
+
+    def __init__(self, nodes: list[str], client: httpx.Client, refresh_seconds: float = SHARD_REFRESH_SECONDS):
+        self.nodes = list(nodes)
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self._owners: dict = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _list_node(self, node: str) -> list[str]:
+        try:
+            response = self.client.get(f"{node}/indexes", timeout=LIST_TIMEOUT)
+            response.raise_for_status()
+            return [item["name"] for item in response.json()]
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as exc:
+            print(f"[shards] Could not list indexes on {node}: {exc}")
+            return []
+
+    def refresh(self) -> dict:
+        """Re-list every node and return the new index -> node map."""
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            listings = list(executor.map(self._list_node, self.nodes))
+
+        owners = {}
+        for node, names in zip(self.nodes, listings):
+            for name in names:
+                if name in owners:
+                    print(f"[shards] Index '{name}' is on {owners[name]} and {node}; using {owners[name]}")
+                    continue
+                owners[name] = node
+
+        with self._lock:
+            self._owners = owners
+            self._refreshed_at = time.monotonic()
+        return owners
+
+    def owners(self) -> dict:
+        if time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            return self.refresh()
+        return self._owners
+
+    def node_for(self, index: str) -> Optional[str]:
+        node = self.owners().get(index)
+        if node is None and time.monotonic() - self._refreshed_at > MISS_REFRESH_SECONDS:
+            # The index may have been published since the last refresh
+            node = self.refresh().get(index)
+        return node
+
+    def placement(self, index: str) -> str:
+        """Node that a new index is built on."""
+        return max(self.nodes, key=lambda node: hashlib.sha256(f"{node}|{index}".encode("utf-8")).digest())
+
+
+client = httpx.Client(timeout=httpx.Timeout(SHARD_REQUEST_TIMEOUT, connect=LIST_TIMEOUT))
+shard_map = ShardMap(SHARD_NODES, client)
+# job_id -> node, so job status requests go straight to the node running the build
+job_nodes: dict = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not SHARD_NODES:
+        raise SystemExit("SHARD_NODES is not set; list the backend node URLs, comma-separated")
+    shard_map.refresh()
+    yield
+    client.close()
+
+
+app = FastAPI(title="REPO-QA Shard Router", lifespan=lifespan)
+
+# CORS for local development
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=False,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def owner_of(index: str) -> str:
+    if not index:
+        raise HTTPException(status_code=400, detail="Index name is required")
+    node = shard_map.node_for(index)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Index '{index}' not found")
+    return node
+
+
+def forward(node: str, method: str, path: str, json: Optional[dict] = None,
+            params: Optional[dict] = None, headers: Optional[dict] = None) -> StreamingResponse:
+    """Send a request to node and stream its response back unchanged (JSON or NDJSON)."""
+    request = client.build_request(method, f"{node}{path}", json=json, params=params, headers=headers)
+    try:
+        response = client.send(request, stream=True)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Node {node} unavailable: {exc}") from exc
+
+    def body():
+        try:
+            yield from response.iter_raw()
+        finally:
+            response.close()
+
+    return StreamingResponse(
+        body(),
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+        headers={name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers},
+    )
+
+
+def get_json(node: str, path: str) -> Optional[httpx.Response]:
+    try:
+        return client.get(f"{node}{path}", timeout=LIST_TIMEOUT)
+    except httpx.HTTPError as exc:
+        print(f"[shards] {node}{path} failed: {exc}")
+        return None
+
+
+@app.get("/indexes")
+def list_indexes():
+    """List the indexes of all nodes."""
+    return [{"name": name} for name in sorted(shard_map.refresh())]
+
+
+@app.post("/ask")
+def ask(payload: dict, x_profile: Optional[str] = Header(default=None)):
+    """Forward a question to the node that serves its index."""
+    node = owner_of(payload.get("index") or "")
+    headers = {"X-Profile": x_profile} if x_profile else None
+    return forward(node, "POST", "/ask", json=payload, headers=headers)
+
+
+@app.post("/ask/batch")
+def ask_batch(payload: dict):
+    """Forward a batch of questions to the node that serves their index."""
+    node = owner_of(payload.get("index") or "")
+    return forward(node, "POST", "/ask/batch", json=payload)
+
+
+@app.get("/indexes/{index}/symbols")
+def find_symbols(index: str, request: Request):
+    return forward(owner_of(index), "GET", f"/indexes/{index}/symbols", params=dict(request.query_params))
+
+
+@app.post("/index/jobs")
+def submit_index_job(payload: dict):
+    """Build on the node that already serves the index, or on its placement node for a new one."""
+    index = payload.get("index") or ""
+    node = shard_map.node_for(index) or shard_map.placement(index)
+    try:
+        response = client.post(f"{node}/index/jobs", json=payload)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Node {node} unavailable: {exc}") from exc
+
+    body = response.json()
+    if response.status_code == 200:
+        job_nodes[body["job_id"]] = node
+        body["node"] = node
+    return JSONResponse(status_code=response.status_code, content=body)
+
+
+@app.get("/index/jobs")
+def list_index_jobs():
+    """List the indexing jobs of all nodes."""
+    jobs = []
+    for node in SHARD_NODES:
+        response = get_json(node, "/index/jobs")
+        if response is None or response.status_code != 200:
+            continue
+        for job in response.json():
+            job_nodes[job["job_id"]] = node
+            jobs.append({**job, "node": node})
+    return jobs
+
+
+def job_node(job_id: str) -> str:
+    if job_id not in job_nodes:
+        # Submitted before this router started; ask every node
+        list_index_jobs()
+    if job_id not in job_nodes:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job_nodes[job_id]
+
+
+@app.get("/index/jobs/{job_id}")
+def get_index_job(job_id: str):
+    return forward(job_node(job_id), "GET", f"/index/jobs/{job_id}")
+
+
+@app.get("/index/jobs/{job_id}/events")
+def stream_index_job(job_id: str, request: Request):
+    return forward(job_node(job_id), "GET", f"/index/jobs/{job_id}/events", params=dict(request.query_params))
+
+
+@app.get("/health")
+def health():
+    """Health check endpoint."""
+    return {"status": "ok", "nodes": len(SHARD_NODES)}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness endpoint: 200 once every node's /ready is, 503 before."""
+    nodes = {}
+    for node in SHARD_NODES:
+        response = get_json(node, "/ready")
+        nodes[node] = "ready" if response is not None and response.status_code == 200 else "not_ready"
+
+    content = {"status": "ready" if all(state == "ready" for state in nodes.values()) else "not_ready", "nodes": nodes}
+    if content["status"] != "ready":
+        return JSONResponse(status_code=503, content=content)
+    return content